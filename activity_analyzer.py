@@ -2,17 +2,32 @@ import json
 import time
 
 import os
+from datetime import datetime
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from collections import deque
 import subprocess
 import signal
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Import Google Gemini
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import SystemMessage, HumanMessage
 
 from dotenv import load_dotenv
 
+from activity_store import PREDICTION, SNAPSHOT, get_activity_store
+from activity_timeline import get_prediction_store
+from capture_scheduler import LOCKED_WINDOWS
+from classification_cache import get_classification_cache
+from llm_clients import get_llm
+from llm_rate_limiter import BACKGROUND, estimate_tokens, get_llm_limiter
+from local_classifier import get_fast_path, record_label
+from rules_engine import get_activity_rules
+from similarity_gate import SimilarityGate
+from snapshot_ring import NOTIFY_FD_ENV, SnapshotRing
+from snapshot_store import TIMESTAMP_FORMAT, get_snapshot_store, parse_timestamp
+
 load_dotenv()
 
 # Google Gemini API key setup
@@ -20,27 +35,29 @@ os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
 
 
-# Initialize Google Gemini LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.3,
-    convert_system_message_to_human=True
-)
+# Google Gemini client settings; the client itself is built on first use
+ACTIVITY_LLM_OPTIONS = {"temperature": 0.3, "convert_system_message_to_human": True}
 
 
 def read_latest_user_data() -> Dict[str, Any]:
-    """Read the latest user data from live_output.json"""
-    try:
-        with open("output/live_output.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-    except json.JSONDecodeError:
-        return {}
+    """Read the latest user data from live_output.json (parsed once per write by the activity store)"""
+    return get_activity_store().latest_snapshot()
+
+
+def snapshot_filename(timestamp: str) -> str:
+    """Legacy file name a snapshot used to be written to"""
+    return f"user_data_{timestamp}.json"
 
 
 def read_user_data_file(filename: str) -> Dict[str, Any]:
-    """Read a specific user data file"""
+    """Read a specific user data snapshot (from the snapshot store, or a legacy JSON file)"""
+    timestamp = filename[len("user_data_"):-len(".json")] if filename.startswith("user_data_") else filename
+    try:
+        snapshot = get_snapshot_store().get(timestamp)
+        if snapshot:
+            return snapshot
+    except ValueError:
+        pass
     try:
         with open(f"output/{filename}", "r", encoding="utf-8") as f:
             return json.load(f)
@@ -51,7 +68,11 @@ def read_user_data_file(filename: str) -> Dict[str, Any]:
 
 
 def get_all_user_data_files() -> List[str]:
-    """Get list of all user data files in output directory"""
+    """Get the names of all stored user data snapshots, oldest first"""
+    stamps = get_snapshot_store().timestamps()
+    if stamps:
+        return [snapshot_filename(datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)) for epoch in stamps]
+    # Nothing migrated yet: fall back to the old one-file-per-snapshot layout
     try:
         files = [f for f in os.listdir("output") if f.startswith("user_data_") and f.endswith(".json")]
         return sorted(files)
@@ -59,51 +80,7 @@ def get_all_user_data_files() -> List[str]:
         return []
 
 
-def analyze_user_activity_from_json(user_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Analyze user data from JSON to determine what the user is doing
-    Returns JSON format with activity classification
-    """
-    if not user_data:
-        return {
-            "activity": "unknown",
-            "confidence": 0.0,
-            "description": "No user data available",
-            "timestamp": time.time()
-        }
-
-    # Extract relevant information from user data
-    active_window = user_data.get("active_window", "")
-    focused_text = user_data.get("focused_text", "")
-    clipboard_content = user_data.get("clipboard", "")
-    # vscode_text = user_data.get("vscode_text", "")
-    ocr_text = user_data.get("ocr_text", "")
-    timestamp = user_data.get("timestamp", "")
-
-    # Combine all text sources for analysis
-    #     combined_text = f"""
-    # Active Window: {active_window}
-    # Focused Text: {focused_text}
-    # Clipboard: {clipboard_content}
-    # VS Code Text: {vscode_text}
-    # Screen OCR: {ocr_text}
-    #     """.strip()
-    combined_text = f"""
-Active Window: {active_window}
-Focused Text: {focused_text}
-Clipboard: {clipboard_content}
-Screen OCR: {ocr_text}
-    """.strip()
-
-    if not combined_text or combined_text.strip() == "":
-        return {
-            "activity": "unknown",
-            "confidence": 0.0,
-            "description": "No meaningful text data available",
-            "timestamp": time.time()
-        }
-
-    system_prompt = """You are an AI assistant that analyzes user activity data to determine what the user is currently doing. 
+ACTIVITY_SYSTEM_PROMPT = """You are an AI assistant that analyzes user activity data to determine what the user is currently doing. 
 
     You have access to multiple data sources:
     - Active Window: The currently active application
@@ -151,49 +128,147 @@ Screen OCR: {ocr_text}
 
     Only return valid JSON, no additional text."""
 
+# Batch requests are packed up to this many estimated prompt tokens
+BATCH_MAX_PROMPT_TOKENS = int(os.getenv("BATCH_MAX_PROMPT_TOKENS", "30000"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "20"))
+# Each snapshot's text is capped in batch mode so one huge OCR dump can't crowd out the rest
+BATCH_ITEM_MAX_CHARS = 6000
+
+
+def build_combined_text(user_data: Dict[str, Any]) -> str:
+    """The text the LLM (and the classification cache) sees for one snapshot"""
+    # Extract relevant information from user data
+    active_window = user_data.get("active_window", "")
+    focused_text = user_data.get("focused_text", "")
+    clipboard_content = user_data.get("clipboard", "")
+    # vscode_text = user_data.get("vscode_text", "")
+    ocr_text = user_data.get("ocr_text", "")
+
+    # Combine all text sources for analysis
+    #     combined_text = f"""
+    # Active Window: {active_window}
+    # Focused Text: {focused_text}
+    # Clipboard: {clipboard_content}
+    # VS Code Text: {vscode_text}
+    # Screen OCR: {ocr_text}
+    #     """.strip()
+    return f"""
+Active Window: {active_window}
+Focused Text: {focused_text}
+Clipboard: {clipboard_content}
+Screen OCR: {ocr_text}
+    """.strip()
+
+
+def classify_without_llm(user_data: Dict[str, Any], combined_text: str) -> Optional[Dict[str, Any]]:
+    """Answer from the empty-data checks, rules, local classifier or cache; None means ask the LLM"""
+    if not user_data:
+        return {
+            "activity": "unknown",
+            "confidence": 0.0,
+            "description": "No user data available",
+            "timestamp": time.time()
+        }
+
+    # Obvious cases (known app, title or domain) are decided by the rules table
+    rules = get_activity_rules()
+    rule_result = rules.classify(user_data) if rules else None
+    if rule_result is not None:
+        return rule_result
+
+    if not combined_text or combined_text.strip() == "":
+        return {
+            "activity": "unknown",
+            "confidence": 0.0,
+            "description": "No meaningful text data available",
+            "timestamp": time.time()
+        }
+
+    # Snapshots the local model is confident about never reach the LLM
+    local_result = get_fast_path().classify(user_data)
+    if local_result is not None:
+        return local_result
+
+    # Content already classified by the LLM (e.g. switching back to a window) is answered from the cache
+    cache = get_classification_cache()
+    return cache.get(combined_text) if cache else None
+
+
+def strip_code_fence(response_text: str) -> str:
+    """Handle markdown-wrapped JSON responses"""
+    if response_text.startswith("```json") and response_text.endswith("```"):
+        # Extract JSON from markdown code blocks
+        json_start = response_text.find("```json") + 7
+        json_end = response_text.rfind("```")
+        if json_start < json_end:
+            response_text = response_text[json_start:json_end].strip()
+    elif response_text.startswith("```") and response_text.endswith("```"):
+        # Extract JSON from generic code blocks
+        json_start = response_text.find("```") + 3
+        json_end = response_text.rfind("```")
+        if json_start < json_end:
+            response_text = response_text[json_start:json_end].strip()
+    return response_text
+
+
+def _remember_llm_result(user_data: Dict[str, Any], combined_text: str, result: Dict[str, Any]):
+    # Training label for the local classifier
+    record_label(user_data, result)
+    cache = get_classification_cache()
+    if cache:
+        cache.put(combined_text, result)
+
+
+def _classify_with_llm(user_data: Dict[str, Any], combined_text: str) -> Dict[str, Any]:
+    """One Gemini request for one snapshot; API errors propagate, an unparseable response gives a failed result"""
     human_prompt = f"Here's the user activity data to analyze:\n\n{combined_text}\n\nPlease analyze this data and determine what the user is doing."
 
+    # Only waits when the shared requests/tokens-per-minute budget is used up; chat goes first
+    waited = get_llm_limiter().acquire(estimate_tokens(ACTIVITY_SYSTEM_PROMPT, human_prompt), priority=BACKGROUND)
+    if waited > 1:
+        print(f"⏳ Waited {waited:.1f}s for LLM rate limit")
+    from langchain.schema import HumanMessage, SystemMessage
+    messages = [
+        SystemMessage(content=ACTIVITY_SYSTEM_PROMPT),
+        HumanMessage(content=human_prompt)
+    ]
+
+    response = get_llm(**ACTIVITY_LLM_OPTIONS)(messages)
+    response_text = response.content.strip()
+
+    # Try to parse the JSON response
     try:
-        time.sleep(10)  # Add 10-second delay before LLM call
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=human_prompt)
-        ]
+        response_text = strip_code_fence(response_text)
+        result = json.loads(response_text)
+        # Ensure timestamp is current
+        result["timestamp"] = time.time()
+        _remember_llm_result(user_data, combined_text, result)
+        return result
+    except json.JSONDecodeError:
+        # Fallback if JSON parsing fails
+        return {
+            "activity": "unknown",
+            "confidence": 0.0,
+            "description": "Failed to parse LLM response",
+            "details": response_text,
+            "data_sources": "LLM response parsing failed",
+            "timestamp": time.time(),
+            "failed": True
+        }
 
-        response = llm(messages)
-        response_text = response.content.strip()
 
-        # Try to parse the JSON response
-        try:
-            # Handle markdown-wrapped JSON responses
-            if response_text.startswith("```json") and response_text.endswith("```"):
-                # Extract JSON from markdown code blocks
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.rfind("```")
-                if json_start < json_end:
-                    response_text = response_text[json_start:json_end].strip()
-            elif response_text.startswith("```") and response_text.endswith("```"):
-                # Extract JSON from generic code blocks
-                json_start = response_text.find("```") + 3
-                json_end = response_text.rfind("```")
-                if json_start < json_end:
-                    response_text = response_text[json_start:json_end].strip()
-
-            result = json.loads(response_text)
-            # Ensure timestamp is current
-            result["timestamp"] = time.time()
-            return result
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "activity": "unknown",
-                "confidence": 0.0,
-                "description": "Failed to parse LLM response",
-                "details": response_text,
-                "data_sources": "LLM response parsing failed",
-                "timestamp": time.time()
-            }
+def analyze_user_activity_from_json(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analyze user data from JSON to determine what the user is doing
+    Returns JSON format with activity classification
+    """
+    combined_text = build_combined_text(user_data) if user_data else ""
+    quick_result = classify_without_llm(user_data, combined_text)
+    if quick_result is not None:
+        return quick_result
 
+    try:
+        return _classify_with_llm(user_data, combined_text)
     except Exception as e:
         return {
             "activity": "unknown",
@@ -201,33 +276,269 @@ Screen OCR: {ocr_text}
             "description": f"Error analyzing user data: {str(e)}",
             "details": "",
             "data_sources": "Error occurred during analysis",
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "failed": True
         }
 
 
-def analyze_historical_data(num_files: int = 5) -> List[Dict[str, Any]]:
-    """Analyze the most recent user data files"""
-    files = get_all_user_data_files()
-    if not files:
-        return []
+class BatchSizer:
+    """Caps items per batch: halves after a response that could not be parsed, grows back by one after a good one"""
+
+    def __init__(self, max_items: int = BATCH_MAX_ITEMS):
+        self.max_items = max_items
+        self.limit = max_items
+
+    def shrink(self):
+        self.limit = max(1, self.limit // 2)
+
+    def grow(self):
+        self.limit = min(self.max_items, self.limit + 1)
+
+
+batch_sizer = BatchSizer()
+
+
+def _next_batch(items: List[Dict[str, Any]], overhead_tokens: int) -> List[Dict[str, Any]]:
+    """The longest prefix of items that stays under BATCH_MAX_PROMPT_TOKENS and the current batch size limit"""
+    tokens = overhead_tokens
+    for count, item in enumerate(items):
+        tokens += item["tokens"]
+        if count and (tokens > BATCH_MAX_PROMPT_TOKENS or count >= batch_sizer.limit):
+            return items[:count]
+    return items
+
+
+def _classify_batch(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """One Gemini request for several snapshots; returns {id: result} for the items that parsed"""
+    sections = [f'--- Snapshot id="{item["id"]}" ---\n{item["text"]}' for item in batch]
+    human_prompt = (
+        f"Here are {len(batch)} separate user activity snapshots to analyze:\n\n" + "\n\n".join(sections) +
+        "\n\nClassify each snapshot independently. Return a JSON array with exactly one object per snapshot, "
+        "each with an \"id\" field holding the snapshot's id plus the fields described above. "
+        "Only return the JSON array, no additional text."
+    )
+    get_llm_limiter().acquire(estimate_tokens(ACTIVITY_SYSTEM_PROMPT, human_prompt), priority=BACKGROUND)
+    from langchain.schema import HumanMessage, SystemMessage
+    response = get_llm(**ACTIVITY_LLM_OPTIONS)([SystemMessage(content=ACTIVITY_SYSTEM_PROMPT), HumanMessage(content=human_prompt)])
+    parsed = json.loads(strip_code_fence(response.content.strip()))
+    if not isinstance(parsed, list):
+        raise ValueError("Batch response is not a JSON array")
+    wanted = {item["id"] for item in batch}
+    results = {}
+    for entry in parsed:
+        if isinstance(entry, dict) and str(entry.get("id")) in wanted and entry.get("activity"):
+            results[str(entry.pop("id"))] = entry
+    return results
+
+
+def _classify_with_retries(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Classify a batch; a batch whose response can't be parsed is split in half and each half retried.
+    API errors (quota, network, auth) propagate: a smaller batch wouldn't fix them"""
+    if len(batch) == 1:
+        # Items only get here after the rules, local model and cache passed on them
+        item = batch[0]
+        return {item["id"]: _classify_with_llm(item["user_data"], item["combined_text"])}
+    try:
+        results = _classify_batch(batch)
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError too, as is a response that isn't a JSON array
+        print(f"⚠️ Batch of {len(batch)} unparseable ({str(e)[:80]}), splitting and retrying")
+        results = {}
+    if not results:
+        batch_sizer.shrink()
+        middle = len(batch) // 2
+        return {**_classify_with_retries(batch[:middle]), **_classify_with_retries(batch[middle:])}
+    batch_sizer.grow()
+    for item in batch:
+        result = results.get(item["id"])
+        if result is not None:
+            result["timestamp"] = time.time()
+            _remember_llm_result(item["user_data"], item["combined_text"], result)
+    missing = [item for item in batch if item["id"] not in results]
+    if missing:
+        # Items the model skipped or garbled are retried in their own, smaller batch
+        results.update(_classify_with_retries(missing))
+    return results
 
-    # Get the most recent files
-    recent_files = files[-num_files:] if len(files) > num_files else files
-    results = []
 
-    for filename in recent_files:
-        user_data = read_user_data_file(filename)
-        if user_data:
-            analysis = analyze_user_activity_from_json(user_data)
-            analysis["source_file"] = filename
-            results.append(analysis)
+def analyze_user_activity_batch(snapshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Classify many snapshots with as few Gemini requests as possible; results keep the input order"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(snapshots)
+    pending = []
+    for index, user_data in enumerate(snapshots):
+        combined_text = build_combined_text(user_data) if user_data else ""
+        quick_result = classify_without_llm(user_data, combined_text)
+        if quick_result is not None:
+            results[index] = quick_result
+            continue
+        text = combined_text[:BATCH_ITEM_MAX_CHARS]
+        pending.append({"id": str(index), "user_data": user_data,
+                        "combined_text": combined_text, "text": text, "tokens": estimate_tokens(text)})
+
+    overhead_tokens = estimate_tokens(ACTIVITY_SYSTEM_PROMPT) + 100
+    remaining = pending
+    batches = 0
+    while remaining:
+        # Packed one at a time so a shrunken size limit applies to the very next batch
+        batch = _next_batch(remaining, overhead_tokens)
+        remaining = remaining[len(batch):]
+        batches += 1
+        for item_id, result in _classify_with_retries(batch).items():
+            results[int(item_id)] = result
+    if pending:
+        print(f"📦 {len(pending)} snapshot(s) sent to the LLM in {batches} batch(es)")
+
+    return [result or {"activity": "unknown", "confidence": 0.0, "description": "Not classified",
+                       "timestamp": time.time(), "failed": True} for result in results]
+
+
+def analyze_historical_data(num_files: int = 5) -> List[Dict[str, Any]]:
+    """Analyze the most recent user data snapshots"""
+    snapshots = get_snapshot_store().latest(num_files)
+    if not snapshots:
+        files = get_all_user_data_files()
+        snapshots = [read_user_data_file(filename) for filename in files[-num_files:]]
+    snapshots = [user_data for user_data in snapshots if user_data]
+    # One Gemini request per batch of snapshots instead of one per snapshot
+    results = analyze_user_activity_batch(snapshots)
+
+    for user_data, analysis in zip(snapshots, results):
+        analysis["source_file"] = snapshot_filename(user_data.get("timestamp", ""))
 
     return results
 
 
+SHARED_PREDICTION_WAIT_SECONDS = float(os.getenv("SHARED_PREDICTION_WAIT_SECONDS", "30"))
+# The analyzer loop touches this file on every pass, including passes that find no new snapshot
+ANALYZER_HEARTBEAT_FILE = "output/analyzer_heartbeat"
+# Longest the analyzer loop blocks waiting for a snapshot before it goes round again
+ANALYZER_WAIT_SECONDS = 60
+# A heartbeat this recent means an analyzer process is running and will classify new snapshots
+ANALYZER_LIVE_SECONDS = 3 * ANALYZER_WAIT_SECONDS
+
+
+def touch_analyzer_heartbeat():
+    try:
+        with open(ANALYZER_HEARTBEAT_FILE, "a"):
+            pass
+        os.utime(ANALYZER_HEARTBEAT_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not update analyzer heartbeat: {e}")
+
+
+def analyzer_is_live() -> bool:
+    """Whether a running analyzer has gone round its loop recently, however long ago it last predicted"""
+    try:
+        return time.time() - os.path.getmtime(ANALYZER_HEARTBEAT_FILE) < ANALYZER_LIVE_SECONDS
+    except OSError:
+        return False
+
+
+class SharedPredictions:
+    """One classification per snapshot, shared by every consumer in every process
+    Predictions are looked up by snapshot timestamp: first the analyzer's latest published prediction,
+    then the activity timeline. The analyzer skips snapshots that queued up while it was busy, so once
+    it has published a prediction for a newer snapshot, that one is used instead. While an analyzer is
+    running (its heartbeat file is fresh), consumers wait for its prediction instead of classifying the
+    snapshot themselves; otherwise the first consumer classifies it and stores the result in the
+    timeline for the others (unless it failed, so the next consumer tries again)."""
+
+    def __init__(self, wait_seconds: float = SHARED_PREDICTION_WAIT_SECONDS):
+        self.wait_seconds = wait_seconds
+        self.reused = 0
+        self.classified = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, snapshot_ts: str) -> Optional[Dict[str, Any]]:
+        latest = get_activity_store().latest_prediction()
+        if latest and latest.get("snapshot_timestamp") == snapshot_ts:
+            return latest
+        prediction = get_prediction_store().get(snapshot_ts)
+        if prediction:
+            return prediction
+        # Snapshot timestamps sort as strings; the analyzer has moved past this snapshot without it
+        if latest and latest.get("snapshot_timestamp", "") > snapshot_ts:
+            return latest
+        return None
+
+    def _reuse(self, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.reused += 1
+        return prediction
+
+    def prediction_for(self, snapshot: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        snapshot_ts = (snapshot or {}).get("timestamp")
+        if snapshot_ts:
+            store = get_activity_store()
+            version = store.version(PREDICTION)
+            deadline = time.monotonic() + self.wait_seconds
+            while True:
+                prediction = self._lookup(snapshot_ts)
+                if prediction:
+                    return self._reuse(prediction)
+                remaining = deadline - time.monotonic()
+                if not analyzer_is_live() or remaining <= 0:
+                    break
+                version = store.wait_for_update(PREDICTION, version, timeout=remaining)
+
+        # Nobody has classified this snapshot; consumers in this process take turns so only one does
+        with self._lock:
+            prediction = self._lookup(snapshot_ts) if snapshot_ts else None
+            if prediction:
+                self.reused += 1
+                return prediction
+            result = analyze_user_activity_from_json(snapshot)
+            self.classified += 1
+        if snapshot_ts and not result.get("failed"):
+            get_prediction_store().put(snapshot_ts, result, source="shared")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"reused": self.reused, "classified": self.classified}
+
+
+_shared_predictions = None
+_shared_predictions_lock = threading.Lock()
+
+
+def get_shared_predictions() -> SharedPredictions:
+    global _shared_predictions
+    with _shared_predictions_lock:
+        if _shared_predictions is None:
+            _shared_predictions = SharedPredictions()
+        return _shared_predictions
+
+
 def analyze_latest_activity() -> dict:
-    user_data = read_latest_user_data()
-    return analyze_user_activity_from_json(user_data)
+    """Prediction for the latest snapshot, reusing the analyzer's classification whenever there is one"""
+    return get_shared_predictions().prediction_for(read_latest_user_data())
+
+
+LATENCY_SAMPLE_SIZE = 200
+
+
+class LatencyTracker:
+    """Capture-to-prediction latency of recent snapshots, plus snapshots skipped as stale"""
+
+    def __init__(self, size: int = LATENCY_SAMPLE_SIZE):
+        self.samples = deque(maxlen=size)
+        self.skipped = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(fraction):
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3) if ordered else 0.0
+        return {
+            "samples": len(ordered),
+            "p50_seconds": percentile(0.5),
+            "p95_seconds": percentile(0.95),
+            "max_seconds": round(ordered[-1], 3) if ordered else 0.0,
+            "skipped": self.skipped
+        }
 
 
 def main():
@@ -237,37 +548,108 @@ def main():
     print("Analyzing data from gatheruserdata.py JSON files")
     print("Press Ctrl+C to stop\n")
 
+    # Create the shared-memory ring before the gatherer starts so this process owns (and unlinks) it
+    ring = None
+    if os.getenv("SNAPSHOT_RING_ENABLED", "1") == "1":
+        try:
+            ring = SnapshotRing.create()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Shared memory unavailable, reading live_output.json instead: {e}")
+
+    # On POSIX the gatherer wakes this process through a pipe after each publish instead of it polling
+    env, pass_fds = None, ()
+    if ring is not None and os.name == "posix":
+        notify_fd = ring.notification_pipe()
+        env, pass_fds = dict(os.environ, **{NOTIFY_FD_ENV: str(notify_fd)}), (notify_fd,)
+
     # Start gatheruserdata.py as a subprocess
     gather_proc = subprocess.Popen([
         sys.executable, "gatheruserdata.py"
-    ])
+    ], env=env, pass_fds=pass_fds)
+    for fd in pass_fds:
+        os.close(fd)  # Only the gatherer holds the write end, so its exit shows up as end of file
     print("🚀 Started gatheruserdata.py in the background (PID: {}), collecting user data...".format(gather_proc.pid))
 
+    store = get_activity_store()
+    timeline = get_prediction_store()
+    gate = SimilarityGate()
+    latency = LatencyTracker()
+    # On SIGTERM (e.g. from a service manager) exit through the finally block: it stops the gatherer,
+    # unlinks the shared-memory ring and flushes queued timeline writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     try:
         last_timestamp = None
+        version = store.version(SNAPSHOT)
+        sequence = 0
+        os.makedirs(os.path.dirname(ANALYZER_HEARTBEAT_FILE), exist_ok=True)
         while True:
-            print("📊 Reading latest user data...")
-            user_data = read_latest_user_data()
+            touch_analyzer_heartbeat()
+            if ring is not None:
+                # Block until the gatherer publishes; the snapshot comes straight from shared memory.
+                # Latest wins: snapshots published while the last one was being classified are skipped
+                previous = sequence
+                sequence, user_data = ring.wait_for(sequence, timeout=ANALYZER_WAIT_SECONDS)
+                if user_data and previous:
+                    latency.skipped += sequence - previous - 1
+            else:
+                print("📊 Reading latest user data...")
+                user_data = read_latest_user_data()
 
             # Only analyze if new data is available
             if user_data and user_data.get("timestamp") != last_timestamp:
                 last_timestamp = user_data.get("timestamp")
-                print("🤖 Analyzing user activity from JSON data...")
-                result = analyze_user_activity_from_json(user_data)
+                # Materially unchanged snapshots keep the previous prediction (up to a maximum age)
+                result = gate.carry_forward(user_data)
+                if result is None:
+                    print("🤖 Analyzing user activity from JSON data...")
+                    result = analyze_user_activity_from_json(user_data)
+                    # A failed call is retried on the next snapshot rather than carried forward
+                    if not result.get("failed"):
+                        gate.remember(user_data, result)
+                gate_stats = gate.stats()
+                print(f"🧮 Similarity gate: {'fired' if result.get('carried_forward') else 'passed'} "
+                      f"({gate_stats['fired']}/{gate_stats['checks']} carried forward, "
+                      f"{gate_stats['forced_refreshes']} forced refreshes)")
+                # Lets other consumers match this prediction to its snapshot (see SharedPredictions)
+                result["snapshot_timestamp"] = last_timestamp
+                # Tells the segmenter the user is away, however the lock screen was classified
+                result["screen_locked"] = user_data.get("active_window", "").strip() in LOCKED_WINDOWS
+                if user_data.get("captured_at"):
+                    result["capture_latency_seconds"] = round(time.time() - user_data["captured_at"], 3)
+                    latency.record(result["capture_latency_seconds"])
                 # Pretty print the JSON result
                 print("📊 Activity Analysis:")
                 print(json.dumps(result, indent=2))
                 try:
-                    with open("output/prediction_output.json", "w", encoding="utf-8") as f:
-                        json.dump(result, f, indent=2)
+                    store.publish_prediction(result)
                 except Exception as e:
                     print(f"❌ Failed to save prediction output: {e}")
+                # Queued; the timeline's writer thread stores it with the next batch
+                timeline.record(last_timestamp, result)
+                waits = get_llm_limiter().stats()["background"]
+                print(f"⏱️ LLM rate-limit waits: {waits['waited']}/{waits['requests']} calls, "
+                      f"p50 {waits['p50_wait_seconds']}s, p95 {waits['p95_wait_seconds']}s")
+                fast_path = get_fast_path().stats()
+                print(f"⚡ Local classifier: {fast_path['local_answers']} answered locally, "
+                      f"{fast_path['llm_escalations']} escalated, {fast_path['llm_calls_avoided']:.0%} of LLM calls avoided")
+                cache = get_classification_cache()
+                if cache:
+                    cache_stats = cache.stats()
+                    print(f"🗃️ Classification cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                          f"{cache_stats['entries']} entries")
+                if result.get("rule"):
+                    print(f"📏 Decided by rule {result['rule']}")
+                latency_stats = latency.stats()
+                print(f"⏱️ Capture-to-prediction latency: p50 {latency_stats['p50_seconds']}s, "
+                      f"p95 {latency_stats['p95_seconds']}s over {latency_stats['samples']} snapshots, "
+                      f"{latency_stats['skipped']} stale snapshots skipped")
                 print("=" * 60)
             else:
                 print("⏳ Waiting for new user data...")
 
-            # Wait before next check
-            time.sleep(10)
+            if ring is None:
+                # Wait for the next published snapshot
+                version = store.wait_for_update(SNAPSHOT, version, timeout=ANALYZER_WAIT_SECONDS)
 
     except KeyboardInterrupt:
         print("\n👋 Activity monitor stopped by user")
@@ -280,6 +662,14 @@ def main():
             gather_proc.wait(timeout=5)
         except subprocess.TimeoutExpired:
             gather_proc.kill()
+        if ring is not None:
+            ring.close()
+        timeline.flush()
+        # Consumers stop waiting for this process's predictions straight away
+        try:
+            os.remove(ANALYZER_HEARTBEAT_FILE)
+        except OSError:
+            pass
         print("✅ gatheruserdata.py stopped.")
 
 
@@ -296,6 +686,130 @@ def analyze_single_file(filename: str):
         print(f"❌ Could not read file: {filename}")
 
 
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+BACKFILL_CHECKPOINT = "output/backfill_checkpoint.json"
+
+
+def parse_time_argument(value: str) -> datetime:
+    """Snapshot-style (2025-07-16_09-36-24) or ISO (2025-07-16, 2025-07-16T09:30) time from the command line"""
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def _load_checkpoint(start: str, end: str) -> Optional[str]:
+    """Timestamp up to which an interrupted backfill of the same range finished, if any"""
+    try:
+        with open(BACKFILL_CHECKPOINT, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if checkpoint.get("start") == start and checkpoint.get("end") == end:
+        return checkpoint.get("watermark")
+    return None
+
+
+def _save_checkpoint(start: str, end: str, watermark: Optional[str], processed: int):
+    tmp_path = BACKFILL_CHECKPOINT + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"start": start, "end": end, "watermark": watermark, "processed": processed,
+                   "updated": time.time()}, f, indent=2)
+    os.replace(tmp_path, BACKFILL_CHECKPOINT)
+
+
+def _backfill_chunk(chunk: List[Dict[str, Any]]) -> int:
+    """Classify the chunk's snapshots that have no prediction yet and store them; returns how many.
+    Raises RuntimeError if any failed: only the successes are stored, so a re-run retries the rest"""
+    predictions = get_prediction_store()
+    done = predictions.existing([snapshot["timestamp"] for snapshot in chunk])
+    todo = [snapshot for snapshot in chunk if snapshot["timestamp"] not in done]
+    if not todo:
+        return 0
+    results = analyze_user_activity_batch(todo)
+    classified = [(snapshot["timestamp"], result) for snapshot, result in zip(todo, results) if not result.get("failed")]
+    predictions.put_many(classified, source="backfill")
+    failed = [result for result in results if result.get("failed")]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(todo)} snapshot(s) failed to classify "
+                           f"({failed[0].get('description', '')[:80]})")
+    return len(todo)
+
+
+def backfill_range(start_arg: str, end_arg: str, workers: int = BACKFILL_WORKERS):
+    """Classify every stored snapshot between two times into the prediction store, resumably"""
+    start = parse_time_argument(start_arg).strftime(TIMESTAMP_FORMAT)
+    end = parse_time_argument(end_arg).strftime(TIMESTAMP_FORMAT)
+    store = get_snapshot_store()
+    start_epoch, end_epoch = parse_timestamp(start), parse_timestamp(end)
+    total = sum(1 for epoch in store.timestamps() if start_epoch <= epoch <= end_epoch)
+    watermark = _load_checkpoint(start, end)
+    print(f"⏩ Backfilling {total} snapshot(s) from {start} to {end} with {workers} worker(s)")
+    if watermark:
+        print(f"   Resuming after checkpoint {watermark}")
+
+    # Workers share the process-wide LLM rate limiter, so concurrency never exceeds the quota
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill")
+    in_flight = {}
+    finished_chunks = {}
+    next_chunk_to_commit = 0
+    processed = classified = 0
+    started = time.monotonic()
+
+    def collect():
+        """Wait for at least one chunk, then record progress and advance the checkpoint"""
+        nonlocal next_chunk_to_commit, processed, classified, watermark
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            index, last_timestamp, size = in_flight.pop(future)
+            classified += future.result()
+            processed += size
+            finished_chunks[index] = last_timestamp
+        # The checkpoint only advances over chunks that are finished with no gaps before them
+        while next_chunk_to_commit in finished_chunks:
+            watermark = finished_chunks.pop(next_chunk_to_commit)
+            next_chunk_to_commit += 1
+        _save_checkpoint(start, end, watermark, processed)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = processed / elapsed
+        eta = (total - processed) / rate if rate else 0
+        print(f"   {processed}/{total} snapshots, {classified} classified, "
+              f"{rate:.1f} snapshots/s, ETA {eta:.0f}s")
+
+    try:
+        chunk, chunk_index = [], 0
+        for snapshot in store.range(start, end):
+            if watermark and snapshot.get("timestamp", "") <= watermark:
+                processed += 1
+                continue
+            chunk.append(snapshot)
+            if len(chunk) >= BATCH_MAX_ITEMS:
+                in_flight[executor.submit(_backfill_chunk, chunk)] = (chunk_index, chunk[-1]["timestamp"], len(chunk))
+                chunk, chunk_index = [], chunk_index + 1
+                # Bounded queue: don't read further ahead than the workers can use
+                while len(in_flight) >= workers * 2:
+                    collect()
+        if chunk:
+            in_flight[executor.submit(_backfill_chunk, chunk)] = (chunk_index, chunk[-1]["timestamp"], len(chunk))
+        while in_flight:
+            collect()
+    except KeyboardInterrupt:
+        print("\n⏸️ Backfill interrupted; run the same command again to resume from the checkpoint")
+        executor.shutdown(wait=True, cancel_futures=True)
+        return
+    except Exception as e:
+        # e.g. quota exhausted or the API unreachable: stop rather than store unclassified snapshots
+        print(f"❌ Backfill stopped: {e}; run the same command again to resume from the checkpoint")
+        executor.shutdown(wait=True, cancel_futures=True)
+        return
+    executor.shutdown()
+    if os.path.exists(BACKFILL_CHECKPOINT):
+        os.remove(BACKFILL_CHECKPOINT)
+    elapsed = time.monotonic() - started
+    print(f"✅ Backfill complete: {classified} snapshot(s) classified in {elapsed:.1f}s; "
+          f"predictions stored in {get_prediction_store().path}")
+
+
 def analyze_recent_files(num_files: int = 5):
     """Analyze the most recent user data files"""
     print(f"🔍 Analyzing {num_files} most recent files...")
@@ -310,8 +824,6 @@ def analyze_recent_files(num_files: int = 5):
 
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) > 1:
         if sys.argv[1] == "--file" and len(sys.argv) > 2:
             analyze_single_file(sys.argv[2])
@@ -319,10 +831,13 @@ if __name__ == "__main__":
             analyze_recent_files(int(sys.argv[2]))
         elif sys.argv[1] == "--recent":
             analyze_recent_files()
+        elif sys.argv[1] == "--range" and len(sys.argv) > 3:
+            backfill_range(sys.argv[2], sys.argv[3])
         else:
             print("Usage:")
             print("  python activity_analyzer.py                    # Monitor live data")
             print("  python activity_analyzer.py --file <filename>  # Analyze specific file")
             print("  python activity_analyzer.py --recent [num]     # Analyze recent files")
+            print("  python activity_analyzer.py --range START END  # Backfill predictions for a time range")
     else:
         main() 
\ No newline at end of file
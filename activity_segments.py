@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Activity Segments - turns the per-snapshot prediction stream into activity sessions
+A single misclassified snapshot shouldn't end a two-hour coding session, so predictions are
+smoothed with hysteresis: the open segment only switches once a different activity has
+collected SEGMENT_SWITCH_EVIDENCE confidence over consecutive predictions, and the new
+segment is then back-dated to the first of them. A gap of more than SEGMENT_MAX_GAP_SECONDS
+between predictions (machine asleep, analyzer stopped) closes the segment where the last
+prediction left it. The gatherer keeps sampling a locked screen every CAPTURE_MAX_SECONDS, so
+the gap threshold sits well above that; predictions of a locked screen count as a "break"
+segment instead, whatever the classifier said.
+
+Subscribers receive events as plain dicts:
+  {"event": "start" | "update" | "end", "activity", "start", "end", "duration_seconds",
+   "predictions", "mean_confidence", "absorbed", "after_break"}
+"update" fires for every prediction that extends the open segment, so duration thresholds
+can be checked without polling. Each open segment keeps only running totals.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from activity_store import PREDICTION, get_activity_store
+from capture_scheduler import CAPTURE_MAX_SECONDS
+
+SEGMENT_SWITCH_EVIDENCE = float(os.getenv("SEGMENT_SWITCH_EVIDENCE", "1.5"))
+SEGMENT_MAX_GAP_SECONDS = float(os.getenv("SEGMENT_MAX_GAP_SECONDS", str(2 * CAPTURE_MAX_SECONDS)))
+# Activity of predictions made while the screen was locked (the analyzer sets "screen_locked")
+BREAK = "break"
+# Segments of these activities (or ended by a gap) count as a break for whoever tracks work sessions
+BREAK_ACTIVITIES = {BREAK}
+
+START = "start"
+UPDATE = "update"
+END = "end"
+
+
+class _Segment:
+    __slots__ = ("activity", "start", "end", "predictions", "confidence_sum", "absorbed", "after_break")
+
+    def __init__(self, activity: str, start: float, after_break: bool):
+        self.activity = activity
+        self.start = start
+        self.end = start
+        self.predictions = 0
+        self.confidence_sum = 0.0
+        self.absorbed = 0  # predictions of another activity that didn't outweigh this one
+        self.after_break = after_break
+
+    def add(self, timestamp: float, confidence: float):
+        self.end = timestamp
+        self.predictions += 1
+        self.confidence_sum += confidence
+
+    def event(self, kind: str) -> Dict[str, Any]:
+        return {
+            "event": kind,
+            "activity": self.activity,
+            "start": self.start,
+            "end": self.end,
+            "duration_seconds": self.end - self.start,
+            "predictions": self.predictions,
+            "mean_confidence": round(self.confidence_sum / self.predictions, 3) if self.predictions else 0.0,
+            "absorbed": self.absorbed,
+            "after_break": self.after_break
+        }
+
+
+class ActivitySegmenter:
+    def __init__(self, switch_evidence: float = SEGMENT_SWITCH_EVIDENCE, max_gap: float = SEGMENT_MAX_GAP_SECONDS):
+        self.switch_evidence = switch_evidence
+        self.max_gap = max_gap
+        self.segment = None
+        self.last_timestamp = None
+        # Consecutive predictions of a different activity that may take over the segment
+        self.challenger = None
+        self.challenger_start = None
+        self.challenger_count = 0
+        self.challenger_confidence = 0.0
+        self._subscribers = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Call callback with every segment event; returns an unsubscribe function"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def feed(self, prediction: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Consume one prediction; returns (and publishes) the segment events it caused"""
+        if prediction.get("screen_locked"):
+            # A locked screen is certain, whatever the classifier made of the lock screen
+            activity, confidence = BREAK, 1.0
+        else:
+            activity = prediction.get("activity") or "unknown"
+            confidence = float(prediction.get("confidence") or 0.0)
+        timestamp = float(prediction.get("timestamp") or time.time())
+        events = []
+        with self._lock:
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                return events  # the same prediction delivered twice, or out of order
+            if self.segment and timestamp - self.last_timestamp > self.max_gap:
+                events.append(self._close(self.last_timestamp))
+            self.last_timestamp = timestamp
+
+            if self.segment is None:
+                # First segment, or the first after a gap: either way the user is starting afresh
+                self._open(activity, timestamp, after_break=True)
+                self.segment.add(timestamp, confidence)
+                events.append(self.segment.event(START))
+            elif activity == self.segment.activity:
+                self.segment.absorbed += self.challenger_count
+                self.segment.add(timestamp, confidence)
+                self._reset_challenger()
+                events.append(self.segment.event(UPDATE))
+            else:
+                if activity != self.challenger:
+                    self.segment.absorbed += self.challenger_count
+                    self.challenger, self.challenger_start = activity, timestamp
+                    self.challenger_count, self.challenger_confidence = 0, 0.0
+                self.challenger_count += 1
+                self.challenger_confidence += confidence
+                if self.challenger_confidence >= self.switch_evidence:
+                    # The challenger takes over from its first prediction, not from now
+                    start, count, total = self.challenger_start, self.challenger_count, self.challenger_confidence
+                    ended = self._close(start)
+                    events.append(ended)
+                    self._open(activity, start, after_break=ended["activity"] in BREAK_ACTIVITIES)
+                    self.segment.end = timestamp
+                    self.segment.predictions, self.segment.confidence_sum = count, total
+                    events.append(self.segment.event(START))
+                else:
+                    # Still counts towards the open segment unless the challenger wins
+                    self.segment.end = timestamp
+                    events.append(self.segment.event(UPDATE))
+        self._publish(events)
+        return events
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Close the open segment where its last prediction left it, e.g. at shutdown"""
+        with self._lock:
+            if self.segment is None:
+                return None
+            event = self._close(self.segment.end)
+        self._publish([event])
+        return event
+
+    def _publish(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for event in events:
+            for callback in subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"[Activity Segments] Subscriber failed on {event['event']} event: {e}")
+
+    def _open(self, activity: str, start: float, after_break: bool):
+        self.segment = _Segment(activity, start, after_break)
+        self._reset_challenger()
+
+    def _close(self, end: float) -> Dict[str, Any]:
+        self.segment.end = end
+        event = self.segment.event(END)
+        self.segment = None
+        self._reset_challenger()
+        return event
+
+    def _reset_challenger(self):
+        self.challenger = None
+        self.challenger_start = None
+        self.challenger_count = 0
+        self.challenger_confidence = 0.0
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The open segment as an "update" event, or None"""
+        with self._lock:
+            return self.segment.event(UPDATE) if self.segment else None
+
+
+_shared_segmenter = None
+_shared_segmenter_lock = threading.Lock()
+
+
+def get_segmenter() -> ActivitySegmenter:
+    """Process-wide segmenter fed by every prediction the activity store sees"""
+    global _shared_segmenter
+    with _shared_segmenter_lock:
+        if _shared_segmenter is None:
+            _shared_segmenter = ActivitySegmenter()
+            get_activity_store().subscribe(PREDICTION, _shared_segmenter.feed)
+        return _shared_segmenter
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--replay":
+        # Segment stored predictions, e.g. to tune SEGMENT_SWITCH_EVIDENCE
+        from datetime import datetime
+        from activity_timeline import get_prediction_store
+        from snapshot_store import parse_timestamp
+
+        def print_segment(event):
+            if event["event"] == END:
+                print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(event['start']))}  "
+                      f"{event['activity']:<12} {event['duration_seconds'] / 60:6.1f} min  "
+                      f"{event['predictions']} predictions, {event['absorbed']} absorbed")
+
+        segmenter = ActivitySegmenter()
+        segmenter.subscribe(print_segment)
+        bounds = [datetime.fromisoformat(value).timestamp() for value in sys.argv[2:4]]
+        predictions = get_prediction_store().range(*bounds)
+        for prediction in predictions:
+            segmenter.feed(dict(prediction, timestamp=parse_timestamp(prediction["snapshot_ts"])))
+        segmenter.finish()
+        print(f"🧩 {len(predictions)} predictions replayed")
+    else:
+        print("Usage:")
+        print("  python activity_segments.py --replay [START [END]]   # Segment timeline predictions (ISO dates/times)")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Activity Store - one in-process owner of the latest snapshot and prediction
+Writers publish through it (atomic replace of live_output.json / prediction_output.json, so
+readers never see a half-written file). Every consumer in the process shares one parsed copy,
+and subscribers get change events from a single watcher instead of re-reading on their own timers.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+LIVE_OUTPUT_FILE = "output/live_output.json"
+PREDICTION_OUTPUT_FILE = "output/prediction_output.json"
+# How often the watcher stats the two files for writes from other processes
+WATCH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_WATCH_INTERVAL", "0.5"))
+
+SNAPSHOT = "snapshot"
+PREDICTION = "prediction"
+
+
+def write_json_atomic(path: str, data: Dict[str, Any], indent: int = 2):
+    """Write to a temp file and rename over the target, so readers see old or new, never half"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+class _Channel:
+    """Latest value of one file plus the subscribers interested in it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.value: Dict[str, Any] = {}
+        self.version = 0
+        self.file_signature = None
+        self.subscribers = []
+
+
+class ActivityStore:
+    def __init__(self, live_path: str = LIVE_OUTPUT_FILE, prediction_path: str = PREDICTION_OUTPUT_FILE,
+                 watch_interval: float = WATCH_INTERVAL_SECONDS):
+        self.channels = {SNAPSHOT: _Channel(live_path), PREDICTION: _Channel(prediction_path)}
+        self.watch_interval = watch_interval
+        self._condition = threading.Condition()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    # ---- publishing ----
+
+    def publish_snapshot(self, snapshot: Dict[str, Any]):
+        self._publish(SNAPSHOT, snapshot, indent=4)
+
+    def publish_prediction(self, prediction: Dict[str, Any]):
+        self._publish(PREDICTION, prediction, indent=2)
+
+    def _publish(self, kind: str, value: Dict[str, Any], indent: int):
+        channel = self.channels[kind]
+        write_json_atomic(channel.path, value, indent)
+        self._update(kind, value, self._file_signature(channel.path))
+
+    # ---- reading ----
+
+    def latest_snapshot(self) -> Dict[str, Any]:
+        return self._latest(SNAPSHOT)
+
+    def latest_prediction(self) -> Dict[str, Any]:
+        return self._latest(PREDICTION)
+
+    def _latest(self, kind: str) -> Dict[str, Any]:
+        # Without the watcher running, check the file once per call (a stat, and a parse only on change)
+        if self._watcher is None:
+            self._poll(kind)
+        # Shallow copy so callers can add keys without touching what other consumers see
+        return dict(self.channels[kind].value)
+
+    def version(self, kind: str) -> int:
+        return self.channels[kind].version
+
+    def wait_for_update(self, kind: str, after_version: int, timeout: Optional[float] = None) -> int:
+        """Block until `kind` moves past `after_version` (or the timeout); returns the current version"""
+        self._ensure_watcher()
+        with self._condition:
+            self._condition.wait_for(lambda: self.channels[kind].version > after_version, timeout)
+            return self.channels[kind].version
+
+    # ---- subscriptions ----
+
+    def subscribe(self, kind: str, callback: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Call `callback(value)` whenever `kind` is written; returns an unsubscribe function
+        Callbacks run on the publishing or watcher thread and share `value`, so they must not mutate it."""
+        channel = self.channels[kind]
+        with self._condition:
+            channel.subscribers.append(callback)
+        self._ensure_watcher()
+
+        def unsubscribe():
+            with self._condition:
+                if callback in channel.subscribers:
+                    channel.subscribers.remove(callback)
+        return unsubscribe
+
+    # ---- internals ----
+
+    @staticmethod
+    def _file_signature(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _poll(self, kind: str) -> bool:
+        """Re-parse the file only if it changed on disk; returns True when a new value was loaded"""
+        channel = self.channels[kind]
+        signature = self._file_signature(channel.path)
+        if signature is None or signature == channel.file_signature:
+            return False
+        try:
+            with open(channel.path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A legacy non-atomic writer caught mid-write: keep the old value, retry next poll
+            return False
+        return self._update(kind, value, signature)
+
+    def _update(self, kind: str, value: Dict[str, Any], signature) -> bool:
+        # Every write is an event, even with an unchanged value (e.g. the same prediction again)
+        channel = self.channels[kind]
+        with self._condition:
+            channel.file_signature = signature
+            channel.value = value
+            channel.version += 1
+            subscribers = list(channel.subscribers)
+            self._condition.notify_all()
+        for callback in subscribers:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"[Activity Store] {kind} subscriber failed: {e}")
+        return True
+
+    def _ensure_watcher(self):
+        with self._condition:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True, name="activity-store-watcher")
+                self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.is_set():
+            for kind in self.channels:
+                self._poll(kind)
+            self._stop.wait(self.watch_interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_activity_store() -> ActivityStore:
+    """Process-wide store shared by every reader and writer in this process"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ActivityStore()
+        return _shared_store
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Activity Timeline - SQLite store of activity predictions keyed by snapshot timestamp
+Every live prediction and every backfilled one lands here, indexed by time and activity, so
+questions like "time per activity per day" or "longest coding streak" are a query away.
+Live writes are queued and flushed in batches by a background thread, so the analyzer loop
+never waits on disk.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from snapshot_store import parse_timestamp
+
+TIMELINE_DB = os.getenv("ACTIVITY_TIMELINE_DB", "output/activity_timeline.sqlite")
+# Queued live predictions are written once this many are waiting or this many seconds passed
+TIMELINE_FLUSH_ROWS = int(os.getenv("TIMELINE_FLUSH_ROWS", "50"))
+TIMELINE_FLUSH_SECONDS = float(os.getenv("TIMELINE_FLUSH_SECONDS", "5"))
+# A prediction counts until the next one, but never for longer than this; longer gaps are time away
+TIMELINE_MAX_GAP_SECONDS = float(os.getenv("TIMELINE_MAX_GAP_SECONDS", "300"))
+
+
+def _epoch(value) -> float:
+    """Snapshot timestamp string or epoch seconds -> epoch seconds"""
+    return parse_timestamp(value) if isinstance(value, str) else float(value)
+
+
+class PredictionStore:
+    def __init__(self, path: str = TIMELINE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS predictions (
+            snapshot_ts TEXT PRIMARY KEY,
+            epoch REAL NOT NULL,
+            activity TEXT NOT NULL,
+            confidence REAL,
+            classifier TEXT,
+            source TEXT,
+            result TEXT NOT NULL,
+            classified_at REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS predictions_epoch ON predictions(epoch)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS predictions_activity_epoch ON predictions(activity, epoch)")
+        self._db.commit()
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]], source: str = "live"):
+        """Store (snapshot timestamp, prediction) pairs in one transaction; newer predictions replace older"""
+        rows = [(snapshot_ts, parse_timestamp(snapshot_ts), prediction.get("activity", "unknown"),
+                 prediction.get("confidence"), prediction.get("classifier", "llm"), source,
+                 json.dumps(prediction), time.time())
+                for snapshot_ts, prediction in items]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def put(self, snapshot_ts: str, prediction: Dict[str, Any], source: str = "live"):
+        self.put_many([(snapshot_ts, prediction)], source)
+
+    def record(self, snapshot_ts: str, prediction: Dict[str, Any]):
+        """Queue a live prediction; the writer thread stores it with the next batch"""
+        self._queue.put((snapshot_ts, prediction))
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TIMELINE_FLUSH_SECONDS
+            stop = batch[0] is None
+            while not stop and len(batch) < TIMELINE_FLUSH_ROWS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                stop = item is None
+                batch.append(item)
+            rows = [item for item in batch if item is not None]
+            if rows:
+                try:
+                    self.put_many(rows, source="live")
+                except (sqlite3.Error, ValueError) as e:
+                    print(f"⚠️ Failed to write {len(rows)} predictions to the timeline: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every queued prediction is on disk"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            self._db.close()
+
+    def existing(self, snapshot_timestamps: List[str]) -> Set[str]:
+        """Which of these snapshot timestamps already have a prediction"""
+        found = set()
+        with self._lock:
+            for i in range(0, len(snapshot_timestamps), 500):
+                chunk = snapshot_timestamps[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in self._db.execute(
+                    f"SELECT snapshot_ts FROM predictions WHERE snapshot_ts IN ({placeholders})", chunk))
+        return found
+
+    def get(self, snapshot_ts: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM predictions WHERE snapshot_ts = ?", (snapshot_ts,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def range(self, start=None, end=None) -> List[Dict[str, Any]]:
+        """Predictions for snapshots with start <= timestamp <= end, oldest first"""
+        lo = float("-inf") if start is None else _epoch(start)
+        hi = float("inf") if end is None else _epoch(end)
+        with self._lock:
+            rows = self._db.execute("SELECT snapshot_ts, result FROM predictions WHERE epoch BETWEEN ? AND ? "
+                                    "ORDER BY epoch", (lo, hi)).fetchall()
+        return [dict(json.loads(result), snapshot_ts=snapshot_ts) for snapshot_ts, result in rows]
+
+    def _rows(self, lo: float, hi: float) -> List[Tuple[float, str, float]]:
+        """(epoch, activity, seconds it lasted) for every prediction in [lo, hi], oldest first"""
+        with self._lock:
+            rows = self._db.execute("""SELECT epoch, activity, LEAD(epoch) OVER (ORDER BY epoch)
+                FROM predictions WHERE epoch BETWEEN ? AND ? ORDER BY epoch""", (lo, hi)).fetchall()
+        return [(epoch, activity, min(next_epoch - epoch, TIMELINE_MAX_GAP_SECONDS) if next_epoch else 0.0)
+                for epoch, activity, next_epoch in rows]
+
+    def time_per_activity(self, start=None, end=None) -> Dict[str, Dict[str, float]]:
+        """{day: {activity: seconds}} over the range, days in local time"""
+        lo = float("-inf") if start is None else _epoch(start)
+        hi = float("inf") if end is None else _epoch(end)
+        with self._lock:
+            rows = self._db.execute("""SELECT date(epoch, 'unixepoch', 'localtime') AS day, activity,
+                    SUM(MIN(COALESCE(next_epoch - epoch, 0), ?)) AS seconds
+                FROM (SELECT epoch, activity, LEAD(epoch) OVER (ORDER BY epoch) AS next_epoch
+                      FROM predictions WHERE epoch BETWEEN ? AND ?)
+                GROUP BY day, activity ORDER BY day, seconds DESC""", (TIMELINE_MAX_GAP_SECONDS, lo, hi)).fetchall()
+        days = {}
+        for day, activity, seconds in rows:
+            days.setdefault(day, {})[activity] = seconds
+        return days
+
+    def spans(self, activity: Optional[str] = None, start=None, end=None) -> List[Dict[str, Any]]:
+        """Uninterrupted runs of one activity (of the given one, if set), oldest first"""
+        lo = float("-inf") if start is None else _epoch(start)
+        hi = float("inf") if end is None else _epoch(end)
+        runs = []
+        current = None
+        for epoch, name, duration in self._rows(lo, hi):
+            if current and current["activity"] == name and epoch - current["end"] <= TIMELINE_MAX_GAP_SECONDS:
+                current["end"] = epoch + duration
+                current["predictions"] += 1
+            else:
+                current = {"activity": name, "start": epoch, "end": epoch + duration, "predictions": 1}
+                runs.append(current)
+        for run in runs:
+            run["seconds"] = run["end"] - run["start"]
+        return [run for run in runs if activity is None or run["activity"] == activity]
+
+    def longest_streak(self, activity: str, start=None, end=None) -> Optional[Dict[str, Any]]:
+        return max(self.spans(activity, start, end), key=lambda run: run["seconds"], default=None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_prediction_store() -> PredictionStore:
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = PredictionStore()
+        return _shared_store
+
+
+def _day_bounds(day: str) -> Tuple[float, float]:
+    """Epoch range of a local calendar day given as YYYY-MM-DD or 'today'"""
+    start = datetime.now() if day == "today" else datetime.strptime(day, "%Y-%m-%d")
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.timestamp(), (start + timedelta(days=1)).timestamp() - 1e-6
+
+
+def _clock(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).strftime("%H:%M")
+
+
+def _duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--daily":
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+        since = _day_bounds("today")[0] - (days - 1) * 86400
+        for day, activities in get_prediction_store().time_per_activity(start=since).items():
+            print(f"📅 {day}: " + ", ".join(f"{a} {_duration(s)}" for a, s in activities.items()))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--streak":
+        activity = sys.argv[2] if len(sys.argv) > 2 else "coding"
+        run = get_prediction_store().longest_streak(activity)
+        if run:
+            print(f"🏆 Longest {activity} streak: {_duration(run['seconds'])} on "
+                  f"{datetime.fromtimestamp(run['start']):%Y-%m-%d} {_clock(run['start'])}-{_clock(run['end'])}")
+        else:
+            print(f"No {activity} predictions in the timeline")
+    elif len(sys.argv) > 2 and sys.argv[1] == "--spans":
+        lo, hi = _day_bounds(sys.argv[3] if len(sys.argv) > 3 else "today")
+        runs = get_prediction_store().spans(sys.argv[2], lo, hi)
+        for run in runs:
+            print(f"  {_clock(run['start'])}-{_clock(run['end'])}  {_duration(run['seconds'])}")
+        print(f"🕒 {len(runs)} {sys.argv[2]} spans, {_duration(sum(r['seconds'] for r in runs))} total")
+    else:
+        print("Usage:")
+        print("  python activity_timeline.py --daily [DAYS]               # Time per activity per day")
+        print("  python activity_timeline.py --streak [ACTIVITY]          # Longest uninterrupted streak (default coding)")
+        print("  python activity_timeline.py --spans ACTIVITY [YYYY-MM-DD] # Every span of an activity on a day (default today)")
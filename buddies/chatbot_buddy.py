@@ -3,31 +3,29 @@
 Chatbot Buddy - An independent conversational AI that engages with the user
 """
 
-import json
 import time
 import random
 import threading
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage, SystemMessage
 import os
 
+from activity_segments import BREAK_ACTIVITIES, START, get_segmenter
+from activity_store import PREDICTION, SNAPSHOT, get_activity_store
+from llm_clients import get_llm
+from llm_rate_limiter import INTERACTIVE, estimate_tokens, get_llm_limiter
+
 load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
 class ChatbotBuddy:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.8,
-            convert_system_message_to_human=True
-        )
         self.last_interaction = None
         self.work_start_time = None
         self.is_active = False
         self.conversation_history = []
         self.current_activity = None
+        self._unsubscribers = []
         
         # Jokes database
         self.jokes = [
@@ -72,11 +70,24 @@ class ChatbotBuddy:
             "You've been productive! 📈 But don't forget to take care of yourself!"
         ]
 
+    @property
+    def llm(self):
+        """Shared Gemini client, built the first time the buddy actually talks"""
+        return get_llm(temperature=0.8, convert_system_message_to_human=True)
+
     def start_monitoring(self):
         """Start the chatbot monitoring in a separate thread"""
         self.is_active = True
         self.work_start_time = datetime.now()
         
+        # Keep current_activity fresh from store events instead of re-reading the files
+        store = get_activity_store()
+        self.current_activity = self.get_current_activity()
+        for kind in (SNAPSHOT, PREDICTION):
+            self._unsubscribers.append(store.subscribe(kind, self._on_activity_changed))
+        # Work sessions restart after breaks, judged from smoothed segments instead of the clock
+        self._unsubscribers.append(get_segmenter().subscribe(self._on_segment))
+        
         # Start monitoring thread
         monitor_thread = threading.Thread(target=self._monitor_work_sessions, daemon=True)
         monitor_thread.start()
@@ -87,28 +98,33 @@ class ChatbotBuddy:
     def stop_monitoring(self):
         """Stop the chatbot monitoring"""
         self.is_active = False
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
         print("🤖 Chatbot Buddy is going to sleep. Goodbye!")
 
     def get_current_activity(self):
         """Get the current user activity data"""
-        try:
-            with open("output/live_output.json", "r") as f:
-                activity_data = json.load(f)
-            
-            # Also get the analyzed activity
-            try:
-                with open("output/prediction_output.json", "r") as f:
-                    analyzed_activity = json.load(f)
-            except:
-                analyzed_activity = {}
-            
-            return {
-                "raw_data": activity_data,
-                "analyzed": analyzed_activity
-            }
-        except Exception as e:
-            print(f"🤖 Error reading activity data: {e}")
+        store = get_activity_store()
+        activity_data = store.latest_snapshot()
+        if not activity_data:
             return None
+        return {
+            "raw_data": activity_data,
+            "analyzed": store.latest_prediction()
+        }
+
+    def _on_activity_changed(self, _value):
+        self.current_activity = self.get_current_activity()
+
+    def _on_segment(self, event):
+        """A break segment pauses the work session; the first segment after a break starts a new one"""
+        if event["event"] != START:
+            return
+        if event["activity"] in BREAK_ACTIVITIES:
+            self.work_start_time = None
+        elif event["after_break"]:
+            self.work_start_time = datetime.fromtimestamp(event["start"])
 
     def _monitor_work_sessions(self):
         """Monitor work sessions and initiate conversations"""
@@ -116,9 +132,6 @@ class ChatbotBuddy:
             try:
                 current_time = datetime.now()
                 
-                # Update current activity
-                self.current_activity = self.get_current_activity()
-                
                 # Check if user has been working for more than 2 hours
                 if self.work_start_time and (current_time - self.work_start_time).total_seconds() > 7200:  # 2 hours
                     if not self.last_interaction or (current_time - self.last_interaction).total_seconds() > 1800:  # 30 minutes
@@ -286,6 +299,8 @@ Keep your responses short (2-3 sentences max), friendly, and conversational. Use
             
             user_prompt += "\n\nRespond as Chatbot Buddy:"
 
+            get_llm_limiter().acquire(estimate_tokens(system_prompt, user_prompt), priority=INTERACTIVE)
+            from langchain.schema import HumanMessage, SystemMessage
             response = self.llm.invoke([
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_prompt)
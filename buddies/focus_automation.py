@@ -7,6 +7,7 @@ Handles focus mode, break reminders, night mode, distraction blocking, and auto-
 import json
 import time
 import threading
+import queue
 import subprocess
 import platform
 import os
@@ -17,6 +18,9 @@ import tkinter as tk
 from tkinter import messagebox
 from dotenv import load_dotenv
 
+from activity_segments import END, get_segmenter
+from activity_store import SNAPSHOT, get_activity_store
+
 load_dotenv()
 
 class FocusAutomation:
@@ -30,6 +34,7 @@ class FocusAutomation:
         self.distraction_sites_blocked = []
         self.auto_save_enabled = True
         self.non_coding_start_time = None  # Track when non-coding activity starts
+        self.last_active_window = None
         
         # Configuration
         self.config = {
@@ -44,14 +49,21 @@ class FocusAutomation:
             "auto_save_interval_seconds": 300  # Auto-save every 5 minutes
         }
         
+        # Segment and snapshot events arrive on the activity store's watcher thread; blocking side
+        # effects (sudo block_sites.sh, dialogs, auto-save keystrokes) run on our own worker instead
+        self._events = queue.Queue()
+        
         # Start monitoring threads
         self._start_monitoring()
         
     def _start_monitoring(self):
         """Start all monitoring threads"""
-        # Focus mode monitoring
-        focus_thread = threading.Thread(target=self._monitor_focus_mode, daemon=True)
-        focus_thread.start()
+        # Worker that handles segment and snapshot events off the watcher thread
+        event_thread = threading.Thread(target=self._process_events, daemon=True)
+        event_thread.start()
+        
+        # Focus mode follows smoothed activity segments rather than single predictions
+        get_segmenter().subscribe(lambda event: self._events.put((self._on_segment, event)))
         
         # Break reminder monitoring
         break_thread = threading.Thread(target=self._monitor_break_reminders, daemon=True)
@@ -61,41 +73,42 @@ class FocusAutomation:
         night_thread = threading.Thread(target=self._monitor_night_mode, daemon=True)
         night_thread.start()
         
-        # Auto-save monitoring
+        # Auto-save reacts to window switches as soon as a snapshot is published
         if self.auto_save_enabled:
-            autosave_thread = threading.Thread(target=self._monitor_auto_save, daemon=True)
-            autosave_thread.start()
+            get_activity_store().subscribe(SNAPSHOT, lambda snapshot: self._events.put((self._on_snapshot, snapshot)))
         
         print("🎯 Focus Automation monitoring started!")
     
-    def _monitor_focus_mode(self):
-        """Monitor for extended coding sessions to enable focus mode and disable only after 30 min of non-coding"""
+    def _process_events(self):
+        """Run queued segment/snapshot handlers one at a time, in arrival order"""
         while True:
+            handler, value = self._events.get()
             try:
-                current_activity = self._get_current_activity()
-                now = datetime.now()
-                if current_activity and current_activity.get("activity") == "coding":
-                    self.non_coding_start_time = None  # Reset non-coding timer
-                    # Enable focus mode if coding for extended period (manual toggle still works)
-                    if not self.focus_start_time:
-                        self.focus_start_time = now
-                    coding_duration = (now - self.focus_start_time).total_seconds() / 60
-                    if coding_duration >= self.config["focus_threshold_minutes"] and not self.is_focus_mode_active:
-                        self._enable_focus_mode()
-                else:
-                    # If not coding, start or update non-coding timer
-                    if self.is_focus_mode_active:
-                        if not self.non_coding_start_time:
-                            self.non_coding_start_time = now
-                        non_coding_duration = (now - self.non_coding_start_time).total_seconds() / 60
-                        if non_coding_duration >= self.config["focus_threshold_minutes"]:
-                            self._disable_focus_mode()
-                            self.non_coding_start_time = None
-                    self.focus_start_time = None
-                time.sleep(60)  # Check every minute
+                handler(value)
             except Exception as e:
-                print(f"🎯 Focus mode monitoring error: {e}")
-                time.sleep(60)
+                print(f"🎯 Event handling error: {e}")
+    
+    def _on_segment(self, event: Dict[str, Any]):
+        """Enable focus mode after a long coding segment; disable only after 30 min of non-coding"""
+        if event["event"] == END:
+            return
+        threshold = self.config["focus_threshold_minutes"] * 60
+        if event["activity"] == "coding":
+            self.non_coding_start_time = None  # Reset non-coding timer
+            # Enable focus mode if coding for extended period (manual toggle still works)
+            self.focus_start_time = datetime.fromtimestamp(event["start"])
+            if event["duration_seconds"] >= threshold and not self.is_focus_mode_active:
+                self._enable_focus_mode()
+        else:
+            # Non-coding time accumulates across segments until coding resumes
+            self.focus_start_time = None
+            if self.is_focus_mode_active:
+                if not self.non_coding_start_time:
+                    self.non_coding_start_time = datetime.fromtimestamp(event["start"])
+                non_coding_duration = event["end"] - self.non_coding_start_time.timestamp()
+                if non_coding_duration >= threshold:
+                    self._disable_focus_mode()
+                    self.non_coding_start_time = None
     
     def _monitor_break_reminders(self):
         """Monitor work intensity and suggest breaks"""
@@ -143,44 +156,25 @@ class FocusAutomation:
                 print(f"🎯 Night mode monitoring error: {e}")
                 time.sleep(300)
     
-    def _monitor_auto_save(self):
-        """Monitor for application switches and auto-save work"""
-        last_active_window = None
-        
-        while True:
-            try:
-                current_activity = self._get_current_activity()
-                current_window = current_activity.get("active_window", "") if current_activity else ""
-                
-                # Check if user switched applications
-                if last_active_window and last_active_window != current_window:
-                    self._auto_save_work(last_active_window, current_window)
-                
-                last_active_window = current_window
-                time.sleep(10)  # Check every 10 seconds
-                
-            except Exception as e:
-                print(f"🎯 Auto-save monitoring error: {e}")
-                time.sleep(10)
+    def _on_snapshot(self, snapshot: Dict[str, Any]):
+        """Auto-save work when a new snapshot shows the user switched applications"""
+        try:
+            current_window = snapshot.get("active_window", "")
+            if self.last_active_window and self.last_active_window != current_window:
+                self._auto_save_work(self.last_active_window, current_window)
+            self.last_active_window = current_window
+        except Exception as e:
+            print(f"🎯 Auto-save monitoring error: {e}")
     
     def _get_current_activity(self) -> Optional[Dict[str, Any]]:
         """Get current activity data"""
-        try:
-            with open("output/live_output.json", "r") as f:
-                data = json.load(f)
-            
-            # Also get analyzed activity
-            try:
-                with open("output/prediction_output.json", "r") as f:
-                    analyzed = json.load(f)
-                    data["analyzed_activity"] = analyzed
-            except:
-                pass
-            
-            return data
-        except Exception as e:
-            print(f"🎯 Error reading activity data: {e}")
+        store = get_activity_store()
+        data = store.latest_snapshot()
+        if not data:
             return None
+        # Also get analyzed activity
+        data["analyzed_activity"] = store.latest_prediction()
+        return data
     
     def _calculate_work_intensity(self):
         """Calculate work intensity based on various factors"""
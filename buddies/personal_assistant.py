@@ -1,7 +1,5 @@
 
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
 load_dotenv()
 import os
 import time
@@ -16,13 +14,22 @@ from buddies.chatbot_buddy import ChatbotBuddy
 from buddies.focus_automation import FocusAutomation
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
-from activity_analyzer import analyze_latest_activity
+from activity_store import SNAPSHOT, get_activity_store
+from llm_clients import get_llm
+from llm_rate_limiter import INTERACTIVE, estimate_tokens, get_llm_limiter
+import meeting_detector
+from startup_profiler import get_startup_profiler
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.7
-)
+# Gemini client settings for every PA Buddy prompt; the client is built on first use
+PA_LLM_OPTIONS = {"temperature": 0.7}
+
+
+def ask_llm(prompt: str):
+    """Send one prompt to the shared PA Buddy client, waiting on the rate limiter at interactive priority"""
+    from langchain.schema import HumanMessage
+    get_llm_limiter().acquire(estimate_tokens(prompt), priority=INTERACTIVE)
+    return get_llm(**PA_LLM_OPTIONS).invoke([HumanMessage(content=prompt)])
 
 
 
@@ -66,8 +73,11 @@ class PersonalAssistantBuddy:
     def __init__(self):
         self.last_event = None
         self.last_user_care = None
-        self.chatbot = ChatbotBuddy()
-        self.focus_automation = FocusAutomation(self)
+        profiler = get_startup_profiler()
+        with profiler.measure("construct", "ChatbotBuddy"):
+            self.chatbot = ChatbotBuddy()
+        with profiler.measure("construct", "FocusAutomation"):
+            self.focus_automation = FocusAutomation(self)
 
     def start_chatbot(self):
         """Start the chatbot buddy"""
@@ -154,8 +164,7 @@ end tell
                 f"👉 Please respond helpfully like a chill, friendly assistant buddy. Be short, clear, and relevant."
             )
 
-            time.sleep(10)  # Add 10-second delay before LLM call
-            response = self.llm.invoke([HumanMessage(content=full_prompt)])
+            response = ask_llm(full_prompt)
             # pa_messages.append(f"🤖 PA Buddy: {response.content.strip()}")
 
         except Exception as e:
@@ -175,8 +184,7 @@ end tell
         )
 
         try:
-            time.sleep(10)  # Add 10-second delay before LLM call
-            response = llm.invoke([HumanMessage(content=prompt)])
+            response = ask_llm(prompt)
             # from shared_queue import pa_messages
             if response and response.content:
                 print("💬 [PA Buddy] Response generated")
@@ -188,26 +196,7 @@ end tell
 
     def extract_event(self, text):
         """Detect meeting/event info from text with enhanced messaging app detection."""
-        # Enhanced patterns for messaging apps and email
-        messaging_patterns = [
-            # WhatsApp/Telegram style patterns - capture more context
-            r"(meet(?:ing)?|call|appointment|catch up|sync|discuss)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2}|\d{1,2}/\d{1,2})[^\n]*?(?:to|for|about|discuss)?[^\n]*?(\w+)?",
-            # Email style patterns
-            r"(schedule|book|arrange|set up|plan)[^\n]*?(meet(?:ing)?|call|appointment)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})",
-            # Time-based patterns with context
-            r"(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})[^\n]*?(meet(?:ing)?|call|discuss|sync)[^\n]*?(?:to|for|about)?[^\n]*?(\w+)?",
-            # Date-based patterns with context
-            r"(tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(meet(?:ing)?|call|discuss)[^\n]*?(?:at|on)?[^\n]*?(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})?",
-            # Simple patterns for basic detection
-            r"(meet(?:ing)?|call|appointment)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})",
-        ]
-        
-        for pattern in messaging_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # Return the full matched text for better context
-                return match.group(0).strip()
-        return None
+        return meeting_detector.extract_event(text)
 
     def detect_messaging_context(self, sys_info):
         """Detect if user is in a messaging context (WhatsApp, email, etc.)"""
@@ -238,56 +227,20 @@ end tell
         ]
         
         combined_text = " ".join(text_sources).lower()
-        
-        # Enhanced meeting keywords
-        meeting_keywords = [
-            "meet", "meeting", "call", "appointment", "sync", "discuss", "catch up",
-            "schedule", "book", "arrange", "set up", "plan", "coordinate"
-        ]
-        
-        # Time/date keywords
-        time_keywords = [
-            "tomorrow", "today", "monday", "tuesday", "wednesday", "thursday", 
-            "friday", "saturday", "sunday", "am", "pm", "morning", "afternoon", "evening"
-        ]
-        
-        # Check if both meeting and time keywords are present
-        has_meeting_keyword = any(keyword in combined_text for keyword in meeting_keywords)
-        has_time_keyword = any(keyword in combined_text for keyword in time_keywords)
-        
-        if has_meeting_keyword and has_time_keyword:
-            # Extract the meeting context - try to get the full sentence or phrase
-            meeting_context = self.extract_full_meeting_context(combined_text)
-            if meeting_context:
-                return meeting_context
-            else:
-                # Fallback to the original extraction
-                return self.extract_event(combined_text)
-        
-        return None
+        # Needs both a meeting and a time keyword; only sentences/lines around meeting words are parsed
+        return meeting_detector.detect_meeting(combined_text)
 
     def extract_full_meeting_context(self, text):
         """Extract the full meeting context from text"""
-        # Look for complete meeting phrases
-        meeting_patterns = [
-            # Full meeting phrases
-            r"[^.]*(meet(?:ing)?|call|appointment|sync|discuss)[^.]*(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})[^.]*",
-            # Time-based phrases
-            r"[^.]*(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})[^.]*(meet(?:ing)?|call|discuss|sync)[^.]*",
-            # Date-based phrases
-            r"[^.]*(tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^.]*(meet(?:ing)?|call|discuss)[^.]*",
-        ]
-        
-        for pattern in meeting_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(0).strip()
-        
-        return None
+        return meeting_detector.extract_meeting_sentence(text)
 
     def monitor_activity(self):
         """Continuously monitor activity_analyzer output and detect actionable events and user care needs."""
         print("[PA Buddy] Monitoring user activity for actionable events and user care...")
+        # Imported here: the analyzer pulls in the classifier stack, which the UI doesn't need at startup
+        from activity_analyzer import analyze_latest_activity, get_shared_predictions
+        store = get_activity_store()
+        version = store.version(SNAPSHOT)
         while True:
             try:
                 # Read live output directly
@@ -300,8 +253,10 @@ end tell
                         self.last_event = meeting_event
                         self.prompt_schedule(meeting_event)
                 
-                # Also check activity analyzer output
+                # Also check activity analyzer output (shared with the analyzer, not classified again)
                 activity = analyze_latest_activity()
+                shared = get_shared_predictions().stats()
+                print(f"[PA Buddy] Activity prediction reused: {shared['reused']}, classified here: {shared['classified']}")
                 description = activity.get("description", "")
                 details = activity.get("details", "")
                 # Detect meeting/event in description or details
@@ -318,7 +273,8 @@ end tell
                     self.prompt_user_care(user_care_action)
             except Exception as e:
                 print(f"[PA Buddy] Error reading activity: {e}")
-            time.sleep(10)
+            # Wake as soon as the next snapshot is published instead of polling
+            version = store.wait_for_update(SNAPSHOT, version, timeout=60)
 
     def prompt_schedule(self, event):
         print(f"[PA Buddy] Would you like to schedule this event? -> {event}")
@@ -369,7 +325,7 @@ Parse this event text and generate the appropriate AppleScript.
 """
             
             # Get LLM response
-            response = llm.invoke([HumanMessage(content=prompt)])
+            response = ask_llm(prompt)
             if response and response.content:
                 script = response.content.strip()
                 
@@ -752,7 +708,7 @@ end tell
 Parse this event text and generate the appropriate AppleScript. Return ONLY the AppleScript code, no markdown, no explanations.
 """
             
-            response = llm.invoke([HumanMessage(content=prompt)])
+            response = ask_llm(prompt)
             if response and response.content:
                 script = response.content.strip()
                 
@@ -808,7 +764,7 @@ Parse this event text and generate the appropriate AppleScript. Return ONLY the
             Output: "Call with John about project - Today at 3:00 PM"
             """
             
-            response = llm.invoke([HumanMessage(content=prompt)])
+            response = ask_llm(prompt)
             if response and response.content:
                 processed_text = response.content.strip()
                 print(f"[PA Buddy] LLM processed meeting text: {processed_text}")
@@ -1164,12 +1120,7 @@ Parse this event text and generate the appropriate AppleScript. Return ONLY the
 
     def read_live_output(self):
         """Read the latest live output data"""
-        try:
-            with open("output/live_output.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[PA Buddy] Error reading live output: {e}")
-            return None
+        return get_activity_store().latest_snapshot() or None
 
     # Focus Automation Methods
     def get_focus_status(self):
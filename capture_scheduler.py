@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Capture Scheduler - picks how long gatheruserdata.py sleeps between snapshots
+Samples faster while the user is switching windows or copying things, backs off
+exponentially while nothing changes, and slows down when the machine is busy.
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+CAPTURE_BASE_SECONDS = float(os.getenv("CAPTURE_BASE_SECONDS", "20"))
+CAPTURE_MIN_SECONDS = float(os.getenv("CAPTURE_MIN_SECONDS", "5"))
+CAPTURE_MAX_SECONDS = float(os.getenv("CAPTURE_MAX_SECONDS", "300"))
+# 1-minute load average per core above which capture slows down
+CAPTURE_CPU_BUDGET = float(os.getenv("CAPTURE_CPU_BUDGET", "0.75"))
+
+# Fields that decide whether two consecutive snapshots are identical
+SNAPSHOT_CONTENT_FIELDS = ("active_window", "focused_text", "clipboard", "vscode_text", "ocr_text")
+# Frontmost process names that mean the screen is locked or the screensaver is up
+LOCKED_WINDOWS = {"loginwindow", "ScreenSaverEngine", "LockApp.exe"}
+
+
+def read_load_per_core() -> Optional[float]:
+    """1-minute load average divided by core count, or None where unavailable (Windows)"""
+    try:
+        with open("/proc/loadavg", "r") as f:
+            load1 = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        try:
+            load1 = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            return None
+    return load1 / (os.cpu_count() or 1)
+
+
+class CaptureScheduler:
+    def __init__(self, base=CAPTURE_BASE_SECONDS, minimum=CAPTURE_MIN_SECONDS,
+                 maximum=CAPTURE_MAX_SECONDS, cpu_budget=CAPTURE_CPU_BUDGET):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cpu_budget = cpu_budget
+        self.previous: Optional[Dict[str, Any]] = None
+        self.idle_streak = 0
+
+    def next_interval(self, snapshot: Dict[str, Any]) -> Tuple[float, str]:
+        """Return (seconds to sleep, reason) based on the snapshot just taken"""
+        previous = self.previous
+        self.previous = snapshot
+
+        if snapshot.get("active_window", "").strip() in LOCKED_WINDOWS:
+            self.idle_streak = 0
+            return self.maximum, "screen locked"
+
+        if previous is None:
+            interval, reason = self.base, "first snapshot"
+        elif snapshot.get("active_window") != previous.get("active_window"):
+            self.idle_streak = 0
+            interval, reason = self.minimum, "active window changed"
+        elif snapshot.get("clipboard") != previous.get("clipboard"):
+            self.idle_streak = 0
+            interval, reason = self.minimum, "clipboard changed"
+        elif all(snapshot.get(k) == previous.get(k) for k in SNAPSHOT_CONTENT_FIELDS):
+            self.idle_streak += 1
+            interval = min(self.maximum, self.base * 2 ** self.idle_streak)
+            reason = f"unchanged for {self.idle_streak} snapshot(s), backing off"
+        else:
+            self.idle_streak = 0
+            interval, reason = self.base, "screen content changed"
+
+        load = read_load_per_core()
+        if load is not None and load > self.cpu_budget:
+            interval = min(self.maximum, interval * load / self.cpu_budget)
+            reason += f"; load {load:.2f}/core over budget {self.cpu_budget:.2f}"
+
+        return round(interval, 1), reason
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Classification Cache - remembers LLM classifications by normalized snapshot content
+Switching back and forth between the same windows produces the same text over and over; the
+cache answers those repeats without another Gemini call. Keys are hashes of the analyzer's
+combined_text with timestamps and other volatile digits stripped. Entries expire after a TTL
+and the least recently used are evicted past a size cap. The cache is a small SQLite file, so
+it survives restarts and is shared by the analyzer and the PA Buddy process.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CACHE_FILE = os.getenv("CLASSIFICATION_CACHE_FILE", "output/classification_cache.sqlite")
+CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_MAX_ENTRIES", "2000"))
+CACHE_TTL_SECONDS = float(os.getenv("CLASSIFICATION_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Expired and over-cap entries are purged every this many writes
+EVICT_EVERY = 50
+
+VOLATILE_PATTERNS = [
+    re.compile(r"\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}(?:[ _t]\d{1,2}[:\-]\d{2}(?:[:\-]\d{2})?)?\b"),  # dates
+    re.compile(r"\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b"),
+    re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\s*(?:am|pm)?\b"),  # clock times
+    re.compile(r"\d+"),  # counters, unread badges, percentages, ...
+]
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    text = text.lower()
+    for pattern in VOLATILE_PATTERNS:
+        text = pattern.sub("0", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def cache_key(combined_text: str) -> str:
+    return hashlib.sha1(normalize_text(combined_text).encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS classifications (
+            key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS classifications_last_used ON classifications(last_used)")
+        self._db.commit()
+
+    def get(self, combined_text: str) -> Optional[Dict[str, Any]]:
+        """The cached classification with a fresh timestamp and cached=True, or None"""
+        key = cache_key(combined_text)
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT result FROM classifications WHERE key = ? AND created > ?",
+                                       (key, now - self.ttl)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._db.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Classification cache read failed: {e}")
+                return None
+            self.hits += 1
+        result = json.loads(row[0])
+        result["timestamp"] = now
+        result["cached"] = True
+        return result
+
+    def put(self, combined_text: str, result: Dict[str, Any]):
+        now = time.time()
+        stored = {k: v for k, v in result.items() if k not in ("timestamp", "cached")}
+        with self._lock:
+            try:
+                self._db.execute("INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?)",
+                                 (cache_key(combined_text), json.dumps(stored), now, now))
+                self._writes += 1
+                if self._writes % EVICT_EVERY == 0:
+                    self._evict(now)
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Classification cache write failed: {e}")
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM classifications WHERE created <= ?", (now - self.ttl,))
+        self._db.execute("""DELETE FROM classifications WHERE key IN (
+            SELECT key FROM classifications ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM classifications")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """Process-wide cache handle, or None if the cache file can't be opened"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = ClassificationCache()
+            except sqlite3.Error as e:
+                print(f"⚠️ Classification cache disabled: {e}")
+                _shared_cache = False
+        return _shared_cache or None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--stats":
+        cache = ClassificationCache()
+        print(f"🗃️ {cache.stats()['entries']} cached classifications in {CACHE_FILE} "
+              f"(max {CACHE_MAX_ENTRIES}, TTL {CACHE_TTL_SECONDS / 3600:g}h)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--clear":
+        ClassificationCache().clear()
+        print("🗃️ Classification cache cleared")
+    else:
+        print("Usage:")
+        print("  python classification_cache.py --stats   # Number of cached classifications")
+        print("  python classification_cache.py --clear   # Drop every cached classification")
@@ -1,12 +1,19 @@
 import datetime
-import pytesseract
-from PIL import ImageGrab
+from PIL import Image, ImageGrab
 import subprocess
 import os
-import json
 import time
 import pyperclip
 import platform
+import threading
+from ocr_engine import PERSISTENT_OCR, OCRTimeout, get_ocr_pool
+from capture_scheduler import CaptureScheduler
+from source_collector import Source, SourceCollector
+from snapshot_store import get_snapshot_store
+from retention import RetentionEngine
+from activity_store import get_activity_store
+from snapshot_ring import SnapshotRing
+from concurrent.futures import ThreadPoolExecutor
 
 # On Windows, import win32gui for window title
 try:
@@ -16,6 +23,33 @@ except ImportError:
     win32gui = None
     win32con = None
 
+# mss grabs the screen straight into a raw BGRA buffer; fall back to PIL's ImageGrab without it
+try:
+    import mss
+except ImportError:
+    mss = None
+
+# Debug only: also write every captured frame to output/screenshot_<ts>.png
+SAVE_SCREENSHOTS = os.getenv("SAVE_SCREENSHOTS", "0") == "1"
+
+# OCR reuse gate: frames whose downsampled signature differs from the last OCR'd frame
+# in at most this many pixels reuse the previous ocr_text (set to -1 to disable)
+OCR_REUSE_THRESHOLD = int(os.getenv("OCR_REUSE_THRESHOLD", "2"))
+FRAME_SIGNATURE_WIDTH = 160
+PIXEL_CHANGE_DELTA = 10
+
+# Incremental OCR: split the frame into a rows x cols grid and only re-OCR tiles that changed.
+# Off by default until its text has been compared against full-frame OCR on real screens.
+# Keep OCR_TILE_COLS at 1 unless the screen is split into side-by-side panes: each tile's text
+# is stitched whole, so a line crossing a vertical cut would come out in two places.
+INCREMENTAL_OCR = os.getenv("INCREMENTAL_OCR", "0") == "1"
+OCR_TILE_ROWS = int(os.getenv("OCR_TILE_ROWS", "6"))
+OCR_TILE_COLS = int(os.getenv("OCR_TILE_COLS", "1"))
+# How far a horizontal cut may move to land on a blank row instead of slicing a line of text
+OCR_CUT_SEARCH_PX = int(os.getenv("OCR_CUT_SEARCH_PX", "24"))
+TILE_SIGNATURE_WIDTH = 48
+TILE_REUSE_THRESHOLD = 0
+
 def is_windows():
     return platform.system() == "Windows"
 
@@ -30,7 +64,7 @@ def get_active_window_title():
     else:
         try:
             script = 'tell application "System Events" to get name of (processes where frontmost is true)'
-            output = subprocess.check_output(['osascript', '-e', script]).decode().strip()
+            output = subprocess.check_output(['osascript', '-e', script], timeout=3).decode().strip()
             return output
         except Exception as e:
             return f"Error (Mac): {e}"
@@ -67,7 +101,7 @@ def get_focused_text():
                 end if
             end tell
             '''
-            result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
+            result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True, timeout=5)
             output = result.stdout.strip()
             if output == "CLIPBOARD":
                 time.sleep(0.3)
@@ -80,70 +114,298 @@ def get_focused_text():
         except Exception as e:
             return f"Error (Mac): {e}"
 
-# Take screenshot
-def capture_screenshot(filename):
-    img = ImageGrab.grab()
-    img.save(f"output/{filename}")
+# mss handles must stay on the thread that created them, so keep one per capture thread
+_screen_grabbers = threading.local()
+
+# Grab the primary screen into memory, no disk round-trip
+def grab_frame():
+    if mss is None:
+        return ImageGrab.grab()
+    grabber = getattr(_screen_grabbers, "mss", None)
+    if grabber is None:
+        grabber = _screen_grabbers.mss = mss.mss()
+    shot = grabber.grab(grabber.monitors[1])
+    # Wrap the raw BGRA buffer without copying; OCR only reads from it
+    return Image.frombuffer("RGB", shot.size, shot.raw, "raw", "BGRX", 0, 1)
+
+# Take screenshot (writes the PNG only when a filename is given)
+def capture_screenshot(filename=None):
+    img = grab_frame()
+    if filename:
+        img.save(f"output/{filename}")
     return img
 
-# Run OCR on image
+# Run OCR on image (persistent worker pool; raises OCRTimeout past the deadline)
 def run_ocr(image):
-    text = pytesseract.image_to_string(image)
-    return text.strip()
+    return get_ocr_pool().recognize(image)
+
+# Run OCR on several images in parallel across the pool's workers
+def run_ocr_many(images):
+    return get_ocr_pool().recognize_many(images)
+
+# Downsampled grayscale signature of a frame, used to detect visible changes
+def compute_frame_signature(image, width=FRAME_SIGNATURE_WIDTH):
+    height = max(1, round(image.height * width / image.width))
+    return image.convert("L").resize((width, height), Image.BOX).tobytes()
+
+# Number of signature pixels whose brightness moved by more than PIXEL_CHANGE_DELTA
+def frame_distance(signature_a, signature_b):
+    if len(signature_a) != len(signature_b):
+        return len(signature_b)
+    return sum(1 for a, b in zip(signature_a, signature_b) if abs(a - b) > PIXEL_CHANGE_DELTA)
+
+def _cpu_seconds():
+    """CPU time of this process plus finished children (tesseract runs as a child)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class OCRReuseGate:
+    """Skips OCR when the screen looks the same as the last OCR'd frame"""
+
+    def __init__(self, threshold=OCR_REUSE_THRESHOLD):
+        self.threshold = threshold
+        self.last_signature = None
+        self.last_text = ""
+        self.hits = 0
+        self.misses = 0
+        self.ocr_cpu_seconds = 0.0
+        self.cpu_seconds_saved = 0.0
+
+    def run(self, image, ocr=run_ocr):
+        """Return (ocr_text, reused) for the frame"""
+        signature = compute_frame_signature(image)
+        if (self.threshold >= 0 and self.last_signature is not None
+                and frame_distance(signature, self.last_signature) <= self.threshold):
+            self.hits += 1
+            self.cpu_seconds_saved += self.average_ocr_cpu_seconds()
+            return self.last_text, True
+
+        start = _cpu_seconds()
+        try:
+            text = ocr(image)
+        except OCRTimeout as e:
+            # Keep the old anchor so the next frame is OCR'd again
+            print(f"[OCR] {e}")
+            return self.last_text, False
+        self.ocr_cpu_seconds += _cpu_seconds() - start
+        self.misses += 1
+        # Keep comparing against the frame the text came from so small changes can't drift
+        self.last_signature = signature
+        self.last_text = text
+        return text, False
+
+    def average_ocr_cpu_seconds(self):
+        return self.ocr_cpu_seconds / self.misses if self.misses else 0.0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "cpu_seconds_saved": round(self.cpu_seconds_saved, 3)
+        }
+
+class IncrementalOCR:
+    """OCRs only the screen tiles that changed since the last capture and
+    stitches the per-tile text back together in reading order (row by row)"""
+
+    def __init__(self, rows=OCR_TILE_ROWS, cols=OCR_TILE_COLS, threshold=TILE_REUSE_THRESHOLD):
+        self.rows = rows
+        self.cols = cols
+        self.threshold = threshold
+        self.frame_size = None
+        self.tile_signatures = {}
+        self.tile_texts = {}
+        self.tiles_ocrd = 0
+        self.tiles_reused = 0
+        self.last_changed_tiles = 0
+
+    def row_cuts(self, image):
+        """y of every horizontal cut (including 0 and the height), each moved to the most
+        uniform row within OCR_CUT_SEARCH_PX of its even split so it falls between text lines"""
+        gray = image.convert("L")
+        width, height = gray.size
+        cuts = [0]
+        for row in range(1, self.rows):
+            nominal = height * row // self.rows
+            best, best_key = nominal, None
+            for y in range(max(cuts[-1] + 1, nominal - OCR_CUT_SEARCH_PX), min(height - 1, nominal + OCR_CUT_SEARCH_PX) + 1):
+                low, high = gray.crop((0, y, width, y + 1)).getextrema()
+                key = (high - low, abs(y - nominal))
+                if best_key is None or key < best_key:
+                    best, best_key = y, key
+            cuts.append(best)
+        cuts.append(height)
+        return cuts
+
+    def tile_boxes(self, image):
+        """(row, col, box) for every tile, in reading order"""
+        cuts = self.row_cuts(image)
+        boxes = []
+        for row in range(self.rows):
+            top, bottom = cuts[row], cuts[row + 1]
+            for col in range(self.cols):
+                left = image.width * col // self.cols
+                right = image.width * (col + 1) // self.cols
+                boxes.append((row, col, (left, top, right, bottom)))
+        return boxes
+
+    def __call__(self, image, ocr_many=run_ocr_many):
+        if image.size != self.frame_size:
+            # Resolution changed (or first frame): nothing cached is valid
+            self.frame_size = image.size
+            self.tile_signatures = {}
+            self.tile_texts = {}
+
+        # A moved cut changes the tile's size, and with it the signature, so it is re-OCR'd
+        boxes = self.tile_boxes(image)
+        changed = []
+        for row, col, box in boxes:
+            tile = image.crop(box)
+            signature = compute_frame_signature(tile, TILE_SIGNATURE_WIDTH)
+            previous = self.tile_signatures.get((row, col))
+            if previous is not None and frame_distance(signature, previous) <= self.threshold:
+                self.tiles_reused += 1
+            else:
+                changed.append(((row, col), tile, signature))
+
+        self.last_changed_tiles = len(changed)
+        if changed:
+            # Changed tiles are OCR'd in parallel across the worker pool. OCRTimeout propagates with
+            # nothing updated: the reuse gate keeps its anchor, and the tiles are retried next frame
+            texts = ocr_many([tile for _, tile, _ in changed])
+            for (key, _, signature), text in zip(changed, texts):
+                self.tile_texts[key] = text
+                self.tile_signatures[key] = signature
+            self.tiles_ocrd += len(changed)
+
+        texts = []
+        for row, col, _ in boxes:
+            text = self.tile_texts.get((row, col), "")
+            if text:
+                texts.append(text)
+        return "\n".join(texts)
+
+    def stats(self):
+        total = self.tiles_ocrd + self.tiles_reused
+        return {
+            "tiles_ocrd": self.tiles_ocrd,
+            "tiles_reused": self.tiles_reused,
+            "tile_reuse_rate": round(self.tiles_reused / total, 3) if total else 0.0,
+            "last_changed_tiles": self.last_changed_tiles
+        }
+
+# Read the VS Code live text file written by the text-extractor extension (cross-platform)
+def read_vscode_text():
+    if platform.system() in ("Darwin", "Windows"):
+        path = os.path.expanduser("~/Desktop/vscode_live_text.txt")
+    else:
+        path = "/tmp/vscode_live_text.txt"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "VS Code text not found."
+
+def is_source_error(value):
+    return isinstance(value, str) and (value.startswith("Error (") or value.startswith("Clipboard error"))
 
 ## Main capture logic (unchanged)
 
 if __name__ == "__main__":
-    import json
-    import time
-    import pyperclip
+    ocr_gate = OCRReuseGate()
+    tile_ocr = None
+    if INCREMENTAL_OCR:
+        if PERSISTENT_OCR:
+            tile_ocr = IncrementalOCR()
+        else:
+            # With pytesseract every changed tile would start its own tesseract process
+            print("[OCR] tesserocr not installed: incremental OCR disabled, OCRing full frames")
+    scheduler = CaptureScheduler()
+    # Old history is compacted in the background, a bounded amount per pass
+    if os.getenv("RETENTION_ENABLED", "1") == "1":
+        RetentionEngine(get_snapshot_store()).start_background()
+
+    # Snapshots reach the analyzer through shared memory; disk writes happen on a side thread
+    ring = None
+    if os.getenv("SNAPSHOT_RING_ENABLED", "1") == "1":
+        try:
+            ring = SnapshotRing.open()
+        except (OSError, ValueError) as e:
+            print(f"[Ring] Shared memory unavailable, falling back to live_output.json: {e}")
+    persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+    # The analyzer stops us with SIGTERM: exit through the finally block so queued writes are flushed
+    import signal
+    import sys
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def persist_snapshot(snapshot):
+        try:
+            get_snapshot_store().append(snapshot)
+            get_activity_store().publish_snapshot(snapshot)
+        except Exception as e:
+            print(f"[Persist] Failed to save snapshot {snapshot.get('timestamp')}: {e}")
+
+    def capture_screen():
+        image = capture_screenshot(screenshot_path)
+        ocr_text, ocr_reused = ocr_gate.run(image, ocr=tile_ocr or run_ocr)
+        return {"ocr_text": ocr_text, "ocr_reused": ocr_reused}
+
+    def read_clipboard():
+        # On Windows, clipboard and focused_text are the same; on Mac, they may differ
+        return textbox_source.last_value if is_windows() else pyperclip.paste()
+
+    textbox_source = Source("focused_text", get_focused_text, timeout=6, is_error=is_source_error)
+    collector = SourceCollector([
+        Source("active_window", get_active_window_title, timeout=4, is_error=is_source_error),
+        textbox_source,
+        # Must follow focused_text: in VS Code that copies the editor contents to the clipboard
+        Source("clipboard", read_clipboard, timeout=2, after="focused_text"),
+        Source("screen", capture_screen, timeout=30, default={"ocr_text": "", "ocr_reused": False}),
+        Source("vscode_text", read_vscode_text, timeout=2),
+    ])
     try:
         while True:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            screenshot_path = f"screenshot_{timestamp}.png"
-            active_window = get_active_window_title()
-            # Use get_focused_text() for textbox_text
-            textbox_text = get_focused_text()
-            # Clipboard logic: On Windows, clipboard and focused_text are the same; on Mac, they may differ
-            if is_windows():
-                clipboard_content = textbox_text
-            else:
-                clipboard_content = pyperclip.paste()
-            image = capture_screenshot(screenshot_path)
-            ocr_text = run_ocr(image)
-            # Delete the screenshot after OCR
-            try:
-                os.remove(f"output/{screenshot_path}")
-            except Exception as e:
-                print(f"[Warning] Failed to delete screenshot: {e}")
-            import os
-            # Read the VS Code live text file (cross-platform)
-            vscode_text = ""
-            if platform.system() == "Darwin":
-                path = os.path.expanduser("~/Desktop/vscode_live_text.txt")
-            elif platform.system() == "Windows":
-                path = os.path.expanduser("~/Desktop/vscode_live_text.txt")
-            else:
-                path = "/tmp/vscode_live_text.txt"
-
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    vscode_text = f.read().strip()
-            except FileNotFoundError:
-                vscode_text = "VS Code text not found."
+            captured_at = time.time()
+            timestamp = datetime.datetime.fromtimestamp(captured_at).strftime("%Y-%m-%d_%H-%M-%S")
+            screenshot_path = f"screenshot_{timestamp}.png" if SAVE_SCREENSHOTS else None
+            values, source_status = collector.collect()
+            active_window = values["active_window"]
+            textbox_text = values["focused_text"]
+            clipboard_content = values["clipboard"]
+            vscode_text = values["vscode_text"]
+            ocr_text = values["screen"]["ocr_text"]
+            # A skipped or failed screen source means the previous text was carried over
+            ocr_reused = values["screen"]["ocr_reused"] or source_status["screen"]["status"] != "ok"
 
             data = {
                 "timestamp": timestamp,
+                "captured_at": captured_at,
                 "active_window": active_window,
                 "focused_text": textbox_text,
                 "clipboard": clipboard_content,
                 "vscode_text": vscode_text,
-                "ocr_text": ocr_text
+                "ocr_text": ocr_text,
+                "ocr_reused": ocr_reused,
+                "ocr_stats": {**ocr_gate.stats(), **(tile_ocr.stats() if tile_ocr else {})},
+                "source_status": source_status
             }
-            with open(f"output/user_data_{timestamp}.json", "w") as f:
-                json.dump(data, f, indent=2)
-            with open("output/live_output.json", "w") as f:
-                json.dump(data, f, indent=4)
-            time.sleep(20)
+            # Decide the next sleep now so the snapshot records why it was chosen
+            interval, interval_reason = scheduler.next_interval(data)
+            data["capture_interval"] = interval
+            data["capture_interval_reason"] = interval_reason
+            if ring is not None:
+                ring.publish(data)
+            # One writer thread keeps snapshots in order on disk without holding up capture
+            persist_executor.submit(persist_snapshot, data)
+            stats = ocr_gate.stats()
+            print(f"[OCR] reused={ocr_reused} hit_rate={stats['hit_rate']:.0%} cpu_saved={stats['cpu_seconds_saved']:.1f}s")
+            print(f"[Capture] next snapshot in {interval}s ({interval_reason})")
+            time.sleep(interval)
     except KeyboardInterrupt:
-        print("Program interrupted by user.")
\ No newline at end of file
+        print("Program interrupted by user.")
+    finally:
+        persist_executor.shutdown(wait=True)
+        if ring is not None:
+            ring.close()
\ No newline at end of file
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+LLM Clients - shared registry of Gemini chat clients, built on first use
+Modules used to construct their own ChatGoogleGenerativeAI at import time, so importing the UI
+paid for the langchain imports and several clients before the first window painted. get_llm()
+imports langchain and builds a client only when one is first needed, and every caller asking
+for the same model, temperature and options gets the same instance. Requests from all clients
+go through google-generativeai's process-wide service client, so they share one connection.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from typing import Any, Dict, Tuple
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.7, **options):
+    """The shared client for this model, temperature and options, constructed on the first call"""
+    key = (model, temperature, tuple(sorted(options.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            client = ChatGoogleGenerativeAI(model=model, temperature=temperature, **options)
+            _clients[key] = client
+        return client
+
+
+# Run in a fresh interpreter: time just the import, then check whether it pulled in langchain and
+# built clients. Clients are counted via gc rather than the registry, so running the benchmark from
+# a checkout that predates the registry gives the "before" numbers.
+_IMPORT_PROBE = """
+import gc, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+clients = sum(type(o).__name__ == "ChatGoogleGenerativeAI" for o in gc.get_objects())
+print(elapsed, int("langchain_google_genai" in sys.modules), clients)
+"""
+
+
+def benchmark_import(module: str = "pa_buddy_ui", runs: int = 5) -> Dict[str, Any]:
+    """Cold import time of `module` from the current directory, each run in a new Python process"""
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        elapsed, langchain_loaded, clients = output[-3:]
+        times.append(float(elapsed))
+    return {
+        "module": module,
+        "runs": runs,
+        "median_seconds": round(statistics.median(times), 3),
+        "min_seconds": round(min(times), 3),
+        "langchain_imported": langchain_loaded == "1",
+        "clients_constructed": int(clients)
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark-import":
+        module = sys.argv[2] if len(sys.argv) > 2 else "pa_buddy_ui"
+        runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+        try:
+            result = benchmark_import(module, runs)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Importing {module} failed:\n{e.stderr}")
+            sys.exit(1)
+        print(f"⏱️ import {module}: median {result['median_seconds']}s, best {result['min_seconds']}s "
+              f"over {runs} cold starts")
+        print(f"   langchain imported: {result['langchain_imported']}, "
+              f"LLM clients constructed: {result['clients_constructed']}")
+    else:
+        print("Usage:")
+        print("  python llm_clients.py --benchmark-import [MODULE] [RUNS]   # Cold import time (default pa_buddy_ui)")
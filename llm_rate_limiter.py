@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+LLM Rate Limiter - one token-bucket limiter shared by every Gemini call in the process
+Callers acquire a request (and an estimate of its tokens) before calling the LLM. Calls only
+wait when the requests-per-minute or tokens-per-minute budget is actually exhausted, and
+interactive callers (chat, user prompts) are served before background classification.
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+LLM_RPM = float(os.getenv("LLM_RPM", "10"))
+LLM_TPM = float(os.getenv("LLM_TPM", "250000"))
+# Requests that may go out back to back before the per-minute rate applies
+LLM_BURST = float(os.getenv("LLM_BURST", "3"))
+
+# Priority classes: lower is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+# Recent waits kept per class for the percentile metrics
+WAIT_SAMPLE_SIZE = 200
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller's budget could not be acquired within its timeout"""
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (about 4 characters per token) used to charge the tokens-per-minute bucket"""
+    return sum(len(text or "") for text in texts) // 4 + 1
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class LLMRateLimiter:
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, burst: float = LLM_BURST):
+        self.requests = TokenBucket(rpm / 60.0, max(1.0, burst))
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+        self._condition = threading.Condition()
+        # Waiting callers as (priority, arrival order); only the head of the heap may take budget
+        self._waiters = []
+        self._arrivals = itertools.count()
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLE_SIZE) for priority in PRIORITY_NAMES}
+        self._totals = {priority: {"requests": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                        for priority in PRIORITY_NAMES}
+
+    def acquire(self, tokens: int = 0, priority: int = BACKGROUND, timeout: Optional[float] = None) -> float:
+        """Block until one request and `tokens` tokens are available; returns the seconds waited"""
+        start = time.monotonic()
+        ticket = (priority, next(self._arrivals))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        wait = max(self.requests.time_until(1, now), self.tokens.time_until(tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            raise RateLimitTimeout(f"LLM rate limit not acquired within {timeout:.1f}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                # Wake the next caller in line
+                self._condition.notify_all()
+            waited = time.monotonic() - start
+            self._record(priority, waited)
+        return waited
+
+    def _record(self, priority: int, waited: float):
+        totals = self._totals[priority]
+        totals["requests"] += 1
+        if waited > 0.001:
+            totals["waited"] += 1
+        totals["wait_seconds"] += waited
+        totals["max_wait_seconds"] = max(totals["max_wait_seconds"], waited)
+        self._waits[priority].append(waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """Wait-time metrics per priority class"""
+        with self._condition:
+            report = {"queued": len(self._waiters)}
+            for priority, name in PRIORITY_NAMES.items():
+                totals = self._totals[priority]
+                waits = sorted(self._waits[priority])
+                report[name] = {
+                    "requests": totals["requests"],
+                    "waited": totals["waited"],
+                    "avg_wait_seconds": round(totals["wait_seconds"] / totals["requests"], 3) if totals["requests"] else 0.0,
+                    "p50_wait_seconds": round(_percentile(waits, 0.5), 3),
+                    "p95_wait_seconds": round(_percentile(waits, 0.95), 3),
+                    "max_wait_seconds": round(totals["max_wait_seconds"], 3)
+                }
+            return report
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMRateLimiter:
+    """Process-wide limiter shared by every LLM caller"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = LLMRateLimiter()
+        return _shared_limiter
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--simulate":
+        # A burst of background classifications with a chat request arriving in the middle
+        limiter = LLMRateLimiter(rpm=float(sys.argv[2]) if len(sys.argv) > 2 else 60, burst=2)
+
+        def call(name, priority, delay):
+            time.sleep(delay)
+            waited = limiter.acquire(estimate_tokens("x" * 4000), priority)
+            print(f"   {name:<14} waited {waited:.2f}s")
+
+        threads = [threading.Thread(target=call, args=(f"background-{i}", BACKGROUND, 0)) for i in range(5)]
+        threads.append(threading.Thread(target=call, args=("interactive", INTERACTIVE, 0.1)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(limiter.stats())
+    else:
+        print(f"LLM budget: {LLM_RPM:g} requests/min, {LLM_TPM:g} tokens/min, burst {LLM_BURST:g}")
+        print("Usage:")
+        print("  python llm_rate_limiter.py --simulate [RPM]   # Show waits for a burst of calls")
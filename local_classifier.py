@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Local Classifier - millisecond activity classification before escalating to Gemini
+A hashed n-gram softmax model (NumPy only) trained on this machine's own history: every LLM
+classification is recorded in output/activity_labels.jsonl together with the snapshot's hashed
+features, so labels stay usable after retention has compacted the snapshot away. Snapshots the model is confident about never
+reach the LLM; everything below LOCAL_CLASSIFIER_THRESHOLD still goes to Gemini.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from snapshot_store import get_snapshot_store
+
+MODEL_FILE = "output/activity_classifier.npz"
+LABELS_FILE = "output/activity_labels.jsonl"
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.85"))
+# LLM labels below this confidence are not used for training
+MIN_LABEL_CONFIDENCE = 0.6
+HASH_DIMENSIONS = 2 ** 16
+# Only the start of each long text field is used; enough to recognise the activity
+MAX_FIELD_CHARS = 4000
+# Bump when featurize() changes, so stored label features from the old scheme are not reused
+FEATURE_VERSION = 1
+
+# Same categories as the analyzer's system prompt
+CATEGORIES = [
+    "coding", "researching", "browsing", "emailing", "messaging", "gaming",
+    "watching", "writing", "designing", "working", "unknown"
+]
+
+TOKEN_RE = re.compile(r"[a-z_][a-z0-9_]+|[{}()\[\];:=<>#@/]")
+
+
+def _hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % HASH_DIMENSIONS
+
+
+def featurize(snapshot: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed window-title unigrams plus text unigrams and bigrams, as (indices, L2-normalised weights)"""
+    counts: Dict[int, float] = {}
+    window_tokens = TOKEN_RE.findall((snapshot.get("active_window") or "").lower())
+    for token in window_tokens:
+        index = _hash("w=" + token)
+        counts[index] = counts.get(index, 0.0) + 1.0
+    for field in ("focused_text", "clipboard", "ocr_text"):
+        tokens = TOKEN_RE.findall((snapshot.get(field) or "")[:MAX_FIELD_CHARS].lower())
+        for i, token in enumerate(tokens):
+            index = _hash(token)
+            counts[index] = counts.get(index, 0.0) + 1.0
+            if i:
+                index = _hash(tokens[i - 1] + " " + token)
+                counts[index] = counts.get(index, 0.0) + 1.0
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    weights = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, weights / np.linalg.norm(weights)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class LocalActivityClassifier:
+    def __init__(self, weights: Optional[np.ndarray] = None, bias: Optional[np.ndarray] = None):
+        self.weights = weights if weights is not None else np.zeros((HASH_DIMENSIONS, len(CATEGORIES)), np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(CATEGORIES), np.float32)
+
+    def predict_proba(self, snapshot: Dict[str, Any]) -> np.ndarray:
+        return self.predict_features_proba(featurize(snapshot))
+
+    def predict_features_proba(self, features: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        indices, weights = features
+        return _softmax(weights @ self.weights[indices] + self.bias)
+
+    def predict(self, snapshot: Dict[str, Any]) -> Tuple[str, float]:
+        return self.predict_features(featurize(snapshot))
+
+    def predict_features(self, features: Tuple[np.ndarray, np.ndarray]) -> Tuple[str, float]:
+        probabilities = self.predict_features_proba(features)
+        best = int(probabilities.argmax())
+        return CATEGORIES[best], float(probabilities[best])
+
+    def fit(self, features: List[Tuple[np.ndarray, np.ndarray]], labels: List[str], epochs: int = 300,
+            learning_rate: float = 2.0, l2: float = 1e-4):
+        """Full-batch gradient descent on the softmax cross-entropy over sparse hashed features
+        (one featurize() result per labelled snapshot)"""
+        rows, cols, values = [], [], []
+        for row, (indices, weights) in enumerate(features):
+            rows.append(np.full(len(indices), row, dtype=np.int64))
+            cols.append(indices)
+            values.append(weights)
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+        targets = np.zeros((len(features), len(CATEGORIES)), np.float32)
+        targets[np.arange(len(features)), [CATEGORIES.index(label) for label in labels]] = 1.0
+        # Only the hashed columns that occur in the data are ever updated
+        used, cols = np.unique(cols, return_inverse=True)
+        weights = self.weights[used].copy()
+        bias = self.bias.copy()
+        n = len(features)
+        for _ in range(epochs):
+            logits = np.zeros((n, len(CATEGORIES)), np.float32)
+            np.add.at(logits, rows, values[:, None] * weights[cols])
+            error = (_softmax(logits + bias) - targets) / n
+            gradient = np.zeros_like(weights)
+            np.add.at(gradient, cols, values[:, None] * error[rows])
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        self.weights[used] = weights
+        self.bias = bias
+
+    def save(self, path: str = MODEL_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights, bias=self.bias, categories=np.array(CATEGORIES))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_FILE) -> "LocalActivityClassifier":
+        with np.load(path) as data:
+            if list(data["categories"]) != CATEGORIES:
+                raise ValueError("Model was trained on a different category list; retrain it")
+            return cls(data["weights"].astype(np.float32), data["bias"].astype(np.float32))
+
+
+class FastPath:
+    """Answers from the local model when it is confident and counts the LLM calls that saved"""
+
+    def __init__(self, path: str = MODEL_FILE, threshold: float = LOCAL_CLASSIFIER_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.model = None
+        self.model_mtime = None
+        self.local_answers = 0
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    def _current_model(self) -> Optional[LocalActivityClassifier]:
+        # Pick up a retrained model without restarting the analyzer
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+        if mtime != self.model_mtime:
+            try:
+                self.model = LocalActivityClassifier.load(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Could not load local classifier: {e}")
+                self.model = None
+            self.model_mtime = mtime
+        return self.model
+
+    def classify(self, snapshot: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A full prediction if the local model is confident enough, else None (ask the LLM)"""
+        with self._lock:
+            model = self._current_model()
+            if model is None:
+                return None
+            start = time.perf_counter()
+            activity, confidence = model.predict(snapshot)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if confidence < self.threshold:
+                self.escalations += 1
+                return None
+            self.local_answers += 1
+        return {
+            "activity": activity,
+            "confidence": round(confidence, 3),
+            "description": f"Classified locally as {activity}",
+            "details": f"Local classifier answered in {elapsed_ms:.1f}ms (threshold {self.threshold:.2f})",
+            "data_sources": "Local classifier over active window and screen text",
+            "classifier": "local",
+            "timestamp": time.time()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.local_answers + self.escalations
+        return {
+            "local_answers": self.local_answers,
+            "llm_escalations": self.escalations,
+            "llm_calls_avoided": round(self.local_answers / total, 3) if total else 0.0
+        }
+
+
+_fast_path = None
+
+
+def get_fast_path() -> FastPath:
+    global _fast_path
+    if _fast_path is None:
+        _fast_path = FastPath()
+    return _fast_path
+
+
+def record_label(snapshot: Dict[str, Any], prediction: Dict[str, Any], path: str = LABELS_FILE):
+    """Remember an LLM classification so the next training run can learn from it"""
+    timestamp = snapshot.get("timestamp")
+    # Only LLM answers are labels; rule and local-model answers would just teach the model itself
+    if not timestamp or prediction.get("classifier") or prediction.get("activity") not in CATEGORIES:
+        return
+    indices, weights = featurize(snapshot)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": timestamp, "activity": prediction["activity"],
+                            "confidence": prediction.get("confidence", 0.0),
+                            "feature_version": FEATURE_VERSION, "indices": indices.tolist(),
+                            "weights": [round(float(w), 4) for w in weights]}) + "\n")
+
+
+def load_training_data(path: str = LABELS_FILE) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], List[str]]:
+    """(features, labels) in time order; the latest label for a timestamp wins. Labels recorded
+    without features (or with an older FEATURE_VERSION) are featurized from the snapshot store
+    while their snapshot still exists."""
+    labels: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("activity") in CATEGORIES and entry.get("confidence", 0.0) >= MIN_LABEL_CONFIDENCE:
+                    labels[entry["timestamp"]] = entry
+    except FileNotFoundError:
+        pass
+    store = None
+    features, targets = [], []
+    for timestamp in sorted(labels):
+        entry = labels[timestamp]
+        if entry.get("feature_version") == FEATURE_VERSION:
+            features.append((np.array(entry["indices"], dtype=np.int64), np.array(entry["weights"], dtype=np.float32)))
+            targets.append(entry["activity"])
+            continue
+        store = store or get_snapshot_store()
+        try:
+            snapshot = store.get(timestamp)
+        except ValueError:
+            snapshot = None
+        if snapshot:
+            features.append(featurize(snapshot))
+            targets.append(entry["activity"])
+    return features, targets
+
+
+def evaluate(model: LocalActivityClassifier, features: List[Tuple[np.ndarray, np.ndarray]], labels: List[str],
+             threshold: float = LOCAL_CLASSIFIER_THRESHOLD) -> Dict[str, Any]:
+    confident = correct = confident_correct = 0
+    start = time.perf_counter()
+    for sample, label in zip(features, labels):
+        activity, confidence = model.predict_features(sample)
+        correct += activity == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += activity == label
+    elapsed = time.perf_counter() - start
+    n = len(features)
+    return {
+        "samples": n,
+        "accuracy": round(correct / n, 3) if n else 0.0,
+        "llm_calls_avoided": round(confident / n, 3) if n else 0.0,
+        "accuracy_when_local": round(confident_correct / confident, 3) if confident else 0.0,
+        "ms_per_prediction": round(elapsed * 1000 / n, 2) if n else 0.0
+    }
+
+
+def _split(features, labels, holdout: float = 0.2):
+    # Time-ordered split: evaluate on the most recent snapshots, as in real use
+    cut = max(1, int(len(features) * (1 - holdout)))
+    return features[:cut], labels[:cut], features[cut:], labels[cut:]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command in ("--train", "--evaluate"):
+        features, labels = load_training_data()
+        if len(features) < 2:
+            print(f"❌ Need at least 2 labelled snapshots in {LABELS_FILE}, found {len(features)}")
+            print("   Labels are recorded each time the analyzer gets an answer from Gemini.")
+            sys.exit(1)
+        print(f"📚 {len(features)} labelled snapshots: " +
+              ", ".join(f"{c}={labels.count(c)}" for c in CATEGORIES if c in labels))
+        train_x, train_y, test_x, test_y = _split(features, labels)
+        if command == "--train":
+            model = LocalActivityClassifier()
+            model.fit(train_x, train_y)
+            if test_x:
+                print(f"🧪 Holdout: {evaluate(model, test_x, test_y)}")
+            # The saved model learns from everything, including the holdout
+            model = LocalActivityClassifier()
+            model.fit(features, labels)
+            model.save()
+            print(f"✅ Saved {MODEL_FILE}")
+        else:
+            try:
+                model = LocalActivityClassifier.load()
+            except FileNotFoundError:
+                print(f"❌ No trained model at {MODEL_FILE}")
+                print("   Run: python local_classifier.py --train")
+                sys.exit(1)
+            print(f"🧪 All labelled snapshots: {evaluate(model, features, labels)}")
+            if test_x:
+                print(f"🧪 Most recent 20%: {evaluate(model, test_x, test_y)}")
+    else:
+        print("Usage:")
+        print("  python local_classifier.py --train      # Train on recorded LLM labels and save the model")
+        print("  python local_classifier.py --evaluate   # Accuracy, speed and LLM calls avoided at the threshold")
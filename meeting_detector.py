@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Meeting Detector - single-pass meeting/event detection for OCR and chat text
+One precompiled regex finds the meeting words in a single pass; the line and the sentence
+around each hit become candidate windows if they also hold a day or digit. The event patterns
+are then tried only on those lines, and the sentence patterns only on those sentences, bounded
+by pos/endpos.
+Results are the same as trying each regex over the whole text:
+- none of the event patterns can match across a newline, so the first matching line holds
+  the leftmost match;
+- the sentence patterns were wrapped in [^.]*...[^.]*, which only widens a match to the whole
+  period-delimited sentence (and made every start position rescan up to the next period).
+"""
+
+import re
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+EVENT_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    # WhatsApp/Telegram style patterns - capture more context
+    r"(meet(?:ing)?|call|appointment|catch up|sync|discuss)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2}|\d{1,2}/\d{1,2})[^\n]*?(?:to|for|about|discuss)?[^\n]*?(\w+)?",
+    # Email style patterns
+    r"(schedule|book|arrange|set up|plan)[^\n]*?(meet(?:ing)?|call|appointment)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})",
+    # Time-based patterns with context
+    r"(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})[^\n]*?(meet(?:ing)?|call|discuss|sync)[^\n]*?(?:to|for|about)?[^\n]*?(\w+)?",
+    # Date-based patterns with context
+    r"(tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(meet(?:ing)?|call|discuss)[^\n]*?(?:at|on)?[^\n]*?(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})?",
+    # Simple patterns for basic detection
+    r"(meet(?:ing)?|call|appointment)[^\n]*?(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})",
+)]
+
+SENTENCE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    # Full meeting phrases
+    r"(meet(?:ing)?|call|appointment|sync|discuss)[^.]*(tomorrow|today|\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})",
+    # Time-based phrases
+    r"(\d{1,2} ?(?:am|pm)|\d{1,2}:\d{2})[^.]*(meet(?:ing)?|call|discuss|sync)",
+    # Date-based phrases
+    r"(tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^.]*(meet(?:ing)?|call|discuss)",
+)]
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# Every pattern needs a meeting word plus a day word or a digit on the same line / in the same sentence
+MEETING_WORDS = re.compile(r"meet|call|appointment|catch up|sync|discuss", re.IGNORECASE)
+DAY_OR_DIGIT = re.compile(r"\d|tomorrow|today|" + "|".join(WEEKDAYS), re.IGNORECASE)
+# detect_meeting() only extracts when the (lowercased) text contains one of each of these
+CONVERSATION_MEETING_KEYWORDS = ("meet", "meeting", "call", "appointment", "sync", "discuss", "catch up",
+                                 "schedule", "book", "arrange", "set up", "plan", "coordinate")
+CONVERSATION_TIME_KEYWORDS = ("tomorrow", "today") + WEEKDAYS + ("am", "pm", "morning", "afternoon", "evening")
+
+
+class TextScan:
+    """Meeting-word hits in one text, and the candidate windows (lines or sentences) around them"""
+    __slots__ = ("text", "hits", "_windows")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.hits = [match.start() for match in MEETING_WORDS.finditer(text)]
+        self._windows = {}
+
+    def windows(self, separator: str) -> List[Tuple[int, int]]:
+        """(start, end) of each separator-delimited window with a meeting word and a day or digit, in order"""
+        windows = self._windows.get(separator)
+        if windows is None:
+            windows = []
+            text = self.text
+            end = -1
+            for position in self.hits:
+                if position < end:
+                    continue  # same window as the previous hit
+                start = text.rfind(separator, 0, position) + 1
+                end = text.find(separator, position)
+                if end == -1:
+                    end = len(text)
+                if DAY_OR_DIGIT.search(text, start, end):
+                    windows.append((start, end))
+            self._windows[separator] = windows
+        return windows
+
+
+def extract_event(text: str, scan: Optional[TextScan] = None) -> Optional[str]:
+    """The first event phrase found by the event patterns, tried in order"""
+    scan = scan or TextScan(text)
+    for pattern in EVENT_PATTERNS:
+        for start, end in scan.windows("\n"):
+            match = pattern.search(text, start, end)
+            if match:
+                return match.group(0).strip()
+    return None
+
+
+def extract_meeting_sentence(text: str, scan: Optional[TextScan] = None) -> Optional[str]:
+    """The first whole sentence matching one of the sentence patterns, tried in order"""
+    scan = scan or TextScan(text)
+    for pattern in SENTENCE_PATTERNS:
+        for start, end in scan.windows("."):
+            if pattern.search(text, start, end):
+                return text[start:end].strip()
+    return None
+
+
+def detect_meeting(text: str) -> Optional[str]:
+    """Meeting phrase in lowercased conversation text, if it mentions both a meeting and a time"""
+    if not (any(keyword in text for keyword in CONVERSATION_MEETING_KEYWORDS)
+            and any(keyword in text for keyword in CONVERSATION_TIME_KEYWORDS)):
+        return None
+    scan = TextScan(text)
+    return extract_meeting_sentence(text, scan) or extract_event(text, scan)
+
+
+# ---- the regex chains this module replaced, kept for --benchmark ----
+
+def _legacy_extract_event(text: str) -> Optional[str]:
+    for pattern in EVENT_PATTERNS:
+        match = re.search(pattern.pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def _legacy_extract_full_meeting_context(text: str) -> Optional[str]:
+    for pattern in SENTENCE_PATTERNS:
+        match = re.search(f"[^.]*{pattern.pattern}[^.]*", text, re.IGNORECASE)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def _legacy_detect_meeting(text: str) -> Optional[str]:
+    has_meeting_keyword = any(keyword in text for keyword in CONVERSATION_MEETING_KEYWORDS)
+    has_time_keyword = any(keyword in text for keyword in CONVERSATION_TIME_KEYWORDS)
+    if has_meeting_keyword and has_time_keyword:
+        return _legacy_extract_full_meeting_context(text) or _legacy_extract_event(text)
+    return None
+
+
+def _recorded_texts(limit: int) -> List[str]:
+    """Lowercased clipboard + focused text + OCR of recent snapshots, as detect_meeting_in_conversation builds it"""
+    from snapshot_store import get_snapshot_store
+    texts = []
+    for snapshot in get_snapshot_store().latest(limit):
+        sources = [snapshot.get("clipboard") or "", snapshot.get("focused_text") or "", snapshot.get("ocr_text") or ""]
+        texts.append(" ".join(sources).lower())
+    return texts
+
+
+def _time_calls(function, texts: List[str]) -> Tuple[List, List[float]]:
+    results, timings = [], []
+    for text in texts:
+        start = time.perf_counter()
+        results.append(function(text))
+        timings.append(time.perf_counter() - start)
+    return results, timings
+
+
+def benchmark(texts: List[str]):
+    """Time the legacy regex chains against the scanner on the same texts and check they agree"""
+    for name, legacy, current in (("detect_meeting_in_conversation", _legacy_detect_meeting, detect_meeting),
+                                  ("extract_event", _legacy_extract_event, extract_event),
+                                  ("extract_full_meeting_context", _legacy_extract_full_meeting_context,
+                                   extract_meeting_sentence)):
+        legacy_results, legacy_times = _time_calls(legacy, texts)
+        results, times = _time_calls(current, texts)
+        mismatches = sum(a != b for a, b in zip(legacy_results, results))
+        found = sum(result is not None for result in results)
+        print(f"📅 {name}: {len(texts)} texts, {found} with a meeting, {mismatches} mismatches")
+        print(f"   regexes: total {sum(legacy_times) * 1000:.1f}ms, median {statistics.median(legacy_times) * 1e6:.0f}µs, "
+              f"max {max(legacy_times) * 1000:.1f}ms")
+        print(f"   scanner: total {sum(times) * 1000:.1f}ms, median {statistics.median(times) * 1e6:.0f}µs, "
+              f"max {max(times) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        if len(sys.argv) > 2 and not sys.argv[2].isdigit():
+            texts = []
+            for path in sys.argv[2:]:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    texts.append(f.read().lower())
+        else:
+            texts = _recorded_texts(int(sys.argv[2]) if len(sys.argv) > 2 else 500)
+        if not texts:
+            print("❌ No recorded snapshots to benchmark on")
+            sys.exit(1)
+        benchmark(texts)
+    else:
+        print("Usage:")
+        print("  python meeting_detector.py --benchmark [N]        # Compare with the old regexes on the N newest snapshots")
+        print("  python meeting_detector.py --benchmark FILE...    # ... or on text files")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+OCR Engine - long-lived OCR workers shared by the capture loop
+Each worker owns one engine handle for its whole life, so language models are loaded once
+and frames are handed over in memory instead of through a tesseract process per call.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import List, Optional
+
+import pytesseract
+
+# tesserocr wraps the tesseract C++ API directly (one PyTessBaseAPI per worker).
+# Without it we fall back to pytesseract, which still spawns a process per call.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# False when OCR falls back to a tesseract process per call, so callers shouldn't multiply calls
+PERSISTENT_OCR = tesserocr is not None
+
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT_SECONDS", "15"))
+
+
+class OCRTimeout(Exception):
+    """Raised when an OCR call misses its deadline or is cancelled"""
+
+
+class OCREngine:
+    """Interface every OCR backend implements"""
+    name = "base"
+
+    def recognize(self, image, timeout: Optional[float] = None) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine(OCREngine):
+    """Persistent tesseract API handle; the language model is loaded once in __init__"""
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def recognize(self, image, timeout: Optional[float] = None) -> str:
+        self.api.SetImage(image)
+        # Recognize() takes its deadline in milliseconds and aborts tesseract when it passes
+        if not self.api.Recognize(int(timeout * 1000) if timeout else 0):
+            raise OCRTimeout("tesseract recognition timed out")
+        return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractEngine(OCREngine):
+    """Fallback: one tesseract process per call, killed when the deadline passes"""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def recognize(self, image, timeout: Optional[float] = None) -> str:
+        try:
+            return pytesseract.image_to_string(image, lang=self.lang, timeout=timeout or 0)
+        except RuntimeError as e:
+            # pytesseract signals a killed process with RuntimeError("Tesseract process timeout")
+            if "timeout" in str(e).lower():
+                raise OCRTimeout(str(e))
+            raise
+
+
+def default_engine_factory() -> OCREngine:
+    if tesserocr is not None:
+        return TesserocrEngine()
+    return PytesseractEngine()
+
+
+class OCRWorkerPool:
+    """Fixed pool of OCR workers, each holding its own engine, with per-call deadlines"""
+
+    def __init__(self, workers: int = OCR_WORKERS, engine_factory=default_engine_factory):
+        self.engine_factory = engine_factory
+        self._local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-worker")
+
+    def _engine(self) -> OCREngine:
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self.engine_factory()
+            self._local.engine = engine
+            with self._engines_lock:
+                self._engines.append(engine)
+        return engine
+
+    def _run(self, image, deadline: float) -> str:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Sat in the queue past its deadline; don't spend CPU on a stale frame
+            raise OCRTimeout("OCR job expired before it started")
+        return self._engine().recognize(image, remaining).strip()
+
+    def submit(self, image, timeout: float = OCR_TIMEOUT_SECONDS):
+        """Queue a frame for OCR; the returned future can be cancelled while still queued"""
+        return self._executor.submit(self._run, image, time.monotonic() + timeout)
+
+    def recognize(self, image, timeout: float = OCR_TIMEOUT_SECONDS) -> str:
+        return self.recognize_many([image], timeout)[0]
+
+    def recognize_many(self, images: List, timeout: float = OCR_TIMEOUT_SECONDS) -> List[str]:
+        """OCR several frames (e.g. changed tiles) in parallel under one shared deadline"""
+        deadline = time.monotonic() + timeout
+        futures = [self._executor.submit(self._run, image, deadline) for image in images]
+        try:
+            return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+        except FutureTimeout:
+            raise OCRTimeout(f"OCR did not finish within {timeout}s")
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._engines_lock:
+            for engine in self._engines:
+                engine.close()
+            self._engines = []
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OCRWorkerPool:
+    """Process-wide pool, created on first use"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = OCRWorkerPool()
+        return _shared_pool
@@ -1,21 +1,21 @@
 import sys
-from PyQt5.QtWidgets import (
-    QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QLineEdit, QTextEdit, QMessageBox,
-    QGroupBox, QScrollArea, QFrame, QSplitter, QSizePolicy, QSpacerItem, QTabWidget
-)
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QFont, QTextCursor, QPalette, QColor, QPixmap, QIcon
-import json
+from startup_profiler import get_startup_profiler
+
+profiler = get_startup_profiler()
+with profiler.measure("import", "PyQt5"):
+    from PyQt5.QtWidgets import (
+        QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QLineEdit, QTextEdit, QMessageBox,
+        QGroupBox, QScrollArea, QFrame, QSplitter, QSizePolicy, QSpacerItem, QTabWidget
+    )
+    from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
+    from PyQt5.QtGui import QFont, QTextCursor, QPalette, QColor, QPixmap, QIcon
 import os
 import re
 import threading
 import time
 from subprocess import run
-from buddies.personal_assistant import PersonalAssistantBuddy
-from focus_control_ui import FocusControlWidget
-
-OUTPUT_FILE = "output/prediction_output.json"
-REFRESH_INTERVAL = 3000  # ms
+from activity_segments import END, get_segmenter
+from activity_store import PREDICTION, get_activity_store
 
 # Modern color scheme
 COLORS = {
@@ -147,6 +147,12 @@ class ModernGroupBox(QGroupBox):
         """)
 
 class PABuddyUI(QWidget):
+    # Predictions arrive on the activity store's watcher thread; the signal hands them to the GUI thread
+    prediction_published = pyqtSignal(dict)
+    segment_changed = pyqtSignal(dict)
+    # PersonalAssistantBuddy is built on a worker thread after the window is shown
+    pa_buddy_ready = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("🤖 Personal Assistant Buddy - Activity Monitor & Chatbot")
@@ -159,25 +165,68 @@ class PABuddyUI(QWidget):
             }}
         """)
         
-        # Initialize PA Buddy
-        self.pa_buddy = PersonalAssistantBuddy()
+        # PA Buddy (and with it the chatbot and focus automation) is loaded by load_pa_buddy()
+        self.pa_buddy = None
         
         # Chatbot thread
-        self.chatbot_thread = ChatbotThread(self.pa_buddy)
+        self.chatbot_thread = ChatbotThread(None)
         self.chatbot_thread.message_received.connect(self.add_chat_message)
         
         # UI Elements
         self.setup_ui_elements()
         self.init_ui()
+        self.set_controls_enabled(False)
         
-        # Timer for activity refresh
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.refresh_activity)
-        self.timer.start(REFRESH_INTERVAL)
+        # Refresh the activity panel whenever a new prediction is published
+        self.prediction_published.connect(self.refresh_activity)
+        self._unsubscribe_prediction = get_activity_store().subscribe(PREDICTION, self.prediction_published.emit)
+        # The session line comes from smoothed segments, so one odd prediction doesn't reset it
+        self.current_segment = get_segmenter().current()
+        self.segment_changed.connect(self.on_segment_changed)
+        self._unsubscribe_segment = get_segmenter().subscribe(self.segment_changed.emit)
         self.refresh_activity()
         
-        # Start chatbot
+        self.pa_buddy_ready.connect(self.on_pa_buddy_ready)
+        self.add_chat_message("system", "⏳ Starting PA Buddy...")
+
+    def load_pa_buddy(self):
+        """Import and construct PA Buddy on a worker thread so the window stays responsive"""
+        threading.Thread(target=self._load_pa_buddy_thread, daemon=True).start()
+
+    def _load_pa_buddy_thread(self):
+        try:
+            with profiler.measure("import", "buddies.personal_assistant"):
+                from buddies.personal_assistant import PersonalAssistantBuddy
+            with profiler.measure("import", "focus_control_ui"):
+                import focus_control_ui  # noqa: F401 - imported here so the GUI thread doesn't pay for it
+            with profiler.measure("construct", "PersonalAssistantBuddy"):
+                pa_buddy = PersonalAssistantBuddy()
+        except Exception as e:
+            self.chatbot_thread.message_received.emit("system", f"❌ Failed to start PA Buddy: {e}")
+            return
+        self.pa_buddy_ready.emit(pa_buddy)
+
+    def on_pa_buddy_ready(self, pa_buddy):
+        """Swap in the Focus Control tab, enable the controls and start the chatbot"""
+        from focus_control_ui import FocusControlWidget
+        self.pa_buddy = pa_buddy
+        self.chatbot_thread.pa_buddy = pa_buddy
+        with profiler.measure("construct", "FocusControlWidget"):
+            focus_control_tab = FocusControlWidget(pa_buddy)
+        index = self.tab_widget.indexOf(self.focus_control_placeholder)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, focus_control_tab, "Focus Control")
+        self.focus_control_placeholder.deleteLater()
+        self.set_controls_enabled(True)
         self.start_chatbot()
+        profiler.mark("PA Buddy ready")
+        profiler.report()
+
+    def set_controls_enabled(self, enabled):
+        """Controls that need PA Buddy stay disabled until it has loaded"""
+        for widget in (self.meeting_input, self.schedule_meeting_btn, self.chat_input, self.chat_send_btn,
+                       self.joke_btn, self.chatbot_status_btn, self.reset_session_btn):
+            widget.setEnabled(enabled)
 
     def setup_ui_elements(self):
         """Setup all UI elements with modern styling"""
@@ -225,7 +274,7 @@ class PABuddyUI(QWidget):
 
     def init_ui(self):
         """Initialize the main UI layout with tabs"""
-        tab_widget = QTabWidget()
+        self.tab_widget = tab_widget = QTabWidget()
         tab_widget.setTabPosition(QTabWidget.North)
         tab_widget.setMovable(False)
         tab_widget.setDocumentMode(True)
@@ -303,12 +352,13 @@ class PABuddyUI(QWidget):
         main_layout.addWidget(splitter)
         pa_buddy_tab.setLayout(main_layout)
 
-        # Focus Control tab
-        focus_control_tab = FocusControlWidget(self.pa_buddy)
+        # Focus Control tab: a placeholder until PA Buddy has loaded (see on_pa_buddy_ready)
+        self.focus_control_placeholder = QLabel("⏳ Loading focus automation...")
+        self.focus_control_placeholder.setAlignment(Qt.AlignCenter)
 
         # Add tabs
         tab_widget.addTab(pa_buddy_tab, "PA Buddy")
-        tab_widget.addTab(focus_control_tab, "Focus Control")
+        tab_widget.addTab(self.focus_control_placeholder, "Focus Control")
 
         # Set main layout
         outer_layout = QVBoxLayout()
@@ -454,18 +504,29 @@ class PABuddyUI(QWidget):
 
     def closeEvent(self, event):
         """Handle window close event"""
+        self._unsubscribe_prediction()
+        self._unsubscribe_segment()
         self.stop_chatbot()
         event.accept()
 
-    def refresh_activity(self):
+    def on_segment_changed(self, event):
+        """Track the open activity segment and show it in the activity panel"""
+        self.current_segment = None if event["event"] == END else event
+        self.refresh_activity()
+
+    def refresh_activity(self, activity=None):
         """Refresh activity display with enhanced formatting"""
         try:
-            with open(OUTPUT_FILE, "r") as f:
-                activity = json.load(f)
+            if activity is None:
+                activity = get_activity_store().latest_prediction()
             
             desc = activity.get("description", "No activity detected")
             details = activity.get("details", "")
             confidence = activity.get("confidence", "")
+            session = "No session yet"
+            if self.current_segment:
+                session = (f"{self.current_segment['activity']} for "
+                           f"{int(self.current_segment['duration_seconds'] // 60)} min")
             
             # Enhanced activity display
             activity_html = f"""
@@ -475,6 +536,7 @@ class PABuddyUI(QWidget):
     <div style="font-size: 13px; color: #34495E;">
         <div><strong>Details:</strong> {details}</div>
         <div><strong>Confidence:</strong> {confidence}</div>
+        <div><strong>Session:</strong> {session}</div>
     </div>
 </div>
             """
@@ -538,11 +600,16 @@ class PABuddyUI(QWidget):
             self.schedule_meeting_btn.setText("📅 Schedule Meeting")
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    with profiler.measure("construct", "QApplication"):
+        app = QApplication(sys.argv)
     
     # Set application style
     app.setStyle('Fusion')
     
-    window = PABuddyUI()
+    with profiler.measure("construct", "PABuddyUI"):
+        window = PABuddyUI()
     window.show()
+    # Zero-delay timers run once the event loop has painted the window
+    QTimer.singleShot(0, lambda: profiler.mark("first paint"))
+    QTimer.singleShot(0, window.load_pa_buddy)
     sys.exit(app.exec_()) 
\ No newline at end of file
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Retention - tiered retention and compaction for the snapshot store
+  tier 1: every snapshot is kept for RETENTION_FULL_HOURS
+  tier 2: then only one representative snapshot per activity segment (a run of snapshots
+          with the same active window) until RETENTION_SEGMENT_DAYS
+  tier 3: after that only per-hour aggregates survive, in output/snapshots/hourly_aggregates.jsonl
+Each pass compacts at most RETENTION_SEGMENTS_PER_PASS store segments, so I/O per pass is bounded:
+blob collection only considers blobs those segments referenced and checks them against the other
+segments' .refs sidecars (lists of hashes), without reading their records.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from snapshot_store import COMPACTED_SUFFIX, SnapshotStore, get_snapshot_store, parse_timestamp, record_blob_hashes
+
+RETENTION_FULL_HOURS = float(os.getenv("RETENTION_FULL_HOURS", "24"))
+RETENTION_SEGMENT_DAYS = float(os.getenv("RETENTION_SEGMENT_DAYS", "14"))
+RETENTION_SEGMENTS_PER_PASS = int(os.getenv("RETENTION_SEGMENTS_PER_PASS", "1"))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "600"))
+# A pause this long between snapshots starts a new activity segment even in the same window
+ACTIVITY_GAP_SECONDS = 300
+# Blobs younger than this are never collected: their snapshot may not be indexed yet
+BLOB_GRACE_SECONDS = 3600
+AGGREGATES_FILE = "hourly_aggregates.jsonl"
+
+
+def _weight(record: Dict[str, Any]) -> int:
+    """How many original snapshots a stored record stands for"""
+    return record.get("retention", {}).get("snapshots", 1)
+
+
+def split_activity_segments(records: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group time-ordered records into runs of the same active window without long gaps"""
+    runs = []
+    previous_epoch = None
+    for record in records:
+        epoch = parse_timestamp(record["timestamp"])
+        if (runs and record.get("active_window") == runs[-1][-1].get("active_window")
+                and epoch - previous_epoch <= ACTIVITY_GAP_SECONDS):
+            runs[-1].append(record)
+        else:
+            runs.append([record])
+        previous_epoch = epoch
+    return runs
+
+
+def representative(run: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The middle snapshot of a run, annotated with the span it now stands for"""
+    record = dict(run[len(run) // 2])
+    record["retention"] = {
+        "tier": "representative",
+        "segment_start": run[0]["timestamp"],
+        "segment_end": run[-1]["timestamp"],
+        "snapshots": sum(_weight(r) for r in run)
+    }
+    return record
+
+
+def hourly_aggregates(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    hours: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        hour = datetime.fromtimestamp(parse_timestamp(record["timestamp"])).strftime("%Y-%m-%d %H:00")
+        aggregate = hours.setdefault(hour, {"hour": hour, "snapshots": 0, "windows": Counter(),
+                                            "first": record["timestamp"], "last": record["timestamp"]})
+        weight = _weight(record)
+        aggregate["snapshots"] += weight
+        aggregate["windows"][record.get("active_window", "") or "unknown"] += weight
+        aggregate["first"] = min(aggregate["first"], record["timestamp"])
+        aggregate["last"] = max(aggregate["last"], record["timestamp"])
+    return [dict(a, windows=dict(a["windows"])) for a in sorted(hours.values(), key=lambda a: a["hour"])]
+
+
+def _estimated_bytes(records: List[Dict[str, Any]]) -> int:
+    return sum(4 + 16 + len(zlib.compress(json.dumps(r, separators=(",", ":")).encode("utf-8"))) for r in records)
+
+
+class RetentionEngine:
+    def __init__(self, store: Optional[SnapshotStore] = None, full_hours: float = RETENTION_FULL_HOURS,
+                 segment_days: float = RETENTION_SEGMENT_DAYS, segments_per_pass: int = RETENTION_SEGMENTS_PER_PASS):
+        self.store = store if store is not None else get_snapshot_store()
+        self.full_hours = full_hours
+        self.segment_days = segment_days
+        self.segments_per_pass = segments_per_pass
+        self.aggregates_path = os.path.join(self.store.root, AGGREGATES_FILE)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def plan(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """(action, segment) pairs that are due, oldest segment first"""
+        now = time.time() if now is None else now
+        actions = []
+        for segment in self.store.segment_names():
+            newest = self.store.segment_newest_epoch(segment)
+            if newest is None:
+                continue
+            if newest < now - self.segment_days * 86400:
+                actions.append(("aggregate", segment))
+            elif newest < now - self.full_hours * 3600 and not segment.endswith(COMPACTED_SUFFIX):
+                actions.append(("compact", segment))
+        return actions
+
+    def run_pass(self, dry_run: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """Apply due actions (bounded per pass) or, in dry-run mode, report what every due action would reclaim"""
+        planned = self.plan(now)
+        todo = planned if dry_run else planned[:self.segments_per_pass]
+        report = {"dry_run": dry_run, "actions": [], "bytes_reclaimed": 0, "pending": len(planned) - len(todo)}
+        # Blobs the processed segments referenced, and those their replacements still reference
+        released, still_referenced = set(), set()
+
+        for action, segment in todo:
+            records = self.store.read_segment(segment)
+            before = self.store.segment_bytes(segment)
+            if action == "compact":
+                kept = [representative(run) for run in split_activity_segments(records)]
+                after = _estimated_bytes(kept)
+                if not dry_run:
+                    self.store.write_segment(segment + COMPACTED_SUFFIX, kept)
+                    self.store.remove_segment(segment)
+                    after = self.store.segment_bytes(segment + COMPACTED_SUFFIX)
+            else:
+                kept = []
+                aggregates = hourly_aggregates(records)
+                after = 0
+                if not dry_run:
+                    with open(self.aggregates_path, "a", encoding="utf-8") as f:
+                        for aggregate in aggregates:
+                            f.write(json.dumps(aggregate) + "\n")
+                    self.store.remove_segment(segment)
+            for record in records:
+                released |= record_blob_hashes(record)
+            for record in kept:
+                still_referenced |= record_blob_hashes(record)
+            report["actions"].append({"action": action, "segment": segment, "snapshots": len(records),
+                                      "kept": len(kept), "bytes_before": before, "bytes_after": after})
+            report["bytes_reclaimed"] += before - after
+
+        if todo:
+            processed = {segment for _, segment in todo}
+            processed |= {segment + COMPACTED_SUFFIX for segment in processed}
+            blob_bytes, blob_count = self.collect_blobs(dry_run, released - still_referenced, processed)
+            report["blobs_removed"] = blob_count
+            report["bytes_reclaimed"] += blob_bytes
+        return report
+
+    def collect_blobs(self, dry_run: bool, candidates: set, processed: set) -> Tuple[int, int]:
+        """Remove candidate blobs (released by the `processed` segments) that no other segment's
+        .refs lists; returns (bytes, count)"""
+        for segment in self.store.segment_names():
+            if not candidates:
+                break
+            if segment not in processed:
+                candidates = candidates - self.store.segment_refs(segment)
+
+        cutoff = time.time() - BLOB_GRACE_SECONDS
+        freed = 0
+        removed = 0
+        for digest in candidates:
+            if dry_run:
+                path = self.store.blobs._path(digest)
+                try:
+                    if os.path.getmtime(path) <= cutoff:
+                        freed += os.path.getsize(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+                continue
+            size = self.store.blobs.remove_if_older(digest, cutoff)
+            if size:
+                freed += size
+                removed += 1
+        return freed, removed
+
+    def read_aggregates(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.aggregates_path, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                report = self.run_pass()
+                if report["actions"]:
+                    print(f"🧹 Retention: {len(report['actions'])} segment(s) processed, "
+                          f"{report['bytes_reclaimed']:,} bytes reclaimed, {report['pending']} pending")
+            except Exception as e:
+                print(f"🧹 Retention error: {e}")
+
+    def start_background(self, interval: float = RETENTION_INTERVAL_SECONDS):
+        """Run one bounded pass every `interval` seconds on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(interval,), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def print_report(report: Dict[str, Any]):
+    verb = "Would reclaim" if report["dry_run"] else "Reclaimed"
+    for action in report["actions"]:
+        print(f"   {action['action']:>9} {action['segment']}: {action['snapshots']} -> {action['kept']} records, "
+              f"{action['bytes_before']:,} -> {action['bytes_after']:,} bytes")
+    if "blobs_removed" in report:
+        print(f"   {report['blobs_removed']} unreferenced blob(s)")
+    print(f"🧹 {verb} {report['bytes_reclaimed']:,} bytes ({report['pending']} action(s) left for later passes)")
+
+
+if __name__ == "__main__":
+    engine = RetentionEngine()
+    if len(sys.argv) > 1 and sys.argv[1] == "--dry-run":
+        print_report(engine.run_pass(dry_run=True))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--run":
+        print_report(engine.run_pass())
+    else:
+        print("Usage:")
+        print("  python retention.py --dry-run   # Report the space every due action would reclaim")
+        print("  python retention.py --run       # Run one bounded retention pass")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Rules Engine - decides obvious activities by lookup before any model or LLM is involved
+Rules come from activity_rules.json and are compiled once:
+  apps     exact (case-insensitive) match on the active window / app name -> dict lookup
+  titles   precompiled regexes over the window title (Windows reports full titles)
+  domains  suffix match on domains seen in the OCR'd screen while a browser is in front,
+           using a trie over reversed domain labels so "m.youtube.com" hits "youtube.com"
+Every rule counts its hits so rules that never fire can be spotted and pruned.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+RULES_FILE = os.getenv("ACTIVITY_RULES_FILE", "activity_rules.json")
+RULE_HITS_FILE = "output/rule_hits.json"
+# Hit counters are flushed to disk every this many evaluations
+HITS_FLUSH_EVERY = 50
+# The URL bar is near the top of the screen, so only the start of the OCR text is scanned
+DOMAIN_SCAN_CHARS = 2000
+DEFAULT_CONFIDENCE = {"app": 0.95, "title": 0.9, "domain": 0.9}
+
+DOMAIN_RE = re.compile(r"\b((?:[a-z0-9-]+\.)+[a-z]{2,})\b")
+TRIE_RULE = "$"
+
+
+class DomainTrie:
+    """Trie over reversed domain labels; lookup returns the longest matching suffix rule"""
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+
+    def add(self, domain: str, value: Any):
+        node = self.root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node[TRIE_RULE] = value
+
+    def lookup(self, domain: str) -> Optional[Any]:
+        node = self.root
+        found = None
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(TRIE_RULE, found)
+        return found
+
+
+class ActivityRules:
+    def __init__(self, config: Dict[str, Any]):
+        confidence = {**DEFAULT_CONFIDENCE, **config.get("confidence", {})}
+        self.apps = {app.strip().lower(): (f"app:{app}", activity, confidence["app"])
+                     for app, activity in config.get("apps", {}).items()}
+        self.titles = []
+        for rule in config.get("titles", []):
+            rule_id = f"title:{rule.get('name', rule['pattern'])}"
+            self.titles.append((re.compile(rule["pattern"], re.IGNORECASE),
+                                (rule_id, rule["activity"], rule.get("confidence", confidence["title"]))))
+        self.browsers = [browser.lower() for browser in config.get("browsers", [])]
+        self.domains = DomainTrie()
+        for domain, activity in config.get("domains", {}).items():
+            self.domains.add(domain, (f"domain:{domain}", activity, confidence["domain"]))
+        self.rule_ids = ([rule[0] for rule in self.apps.values()] + [rule[0] for _, rule in self.titles] +
+                         [f"domain:{domain}" for domain in config.get("domains", {})])
+        self.hits = {rule_id: 0 for rule_id in self.rule_ids}
+        self.evaluations = 0
+        self.fallthroughs = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = RULES_FILE) -> "ActivityRules":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, snapshot: Dict[str, Any]) -> Optional[Tuple[str, str, float]]:
+        """(rule id, activity, confidence) of the first rule that fires: app, then title, then domain"""
+        window = (snapshot.get("active_window") or "").strip()
+        window_lower = window.lower()
+        rule = self.apps.get(window_lower)
+        if rule:
+            return rule
+        for pattern, rule in self.titles:
+            if pattern.search(window):
+                return rule
+        if any(browser in window_lower for browser in self.browsers):
+            screen = (snapshot.get("ocr_text") or "")[:DOMAIN_SCAN_CHARS].lower()
+            for domain in DOMAIN_RE.findall(screen):
+                rule = self.domains.lookup(domain)
+                if rule:
+                    return rule
+        return None
+
+    def classify(self, snapshot: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A full prediction if a rule fires, else None so the caller falls through"""
+        rule = self.match(snapshot)
+        with self._lock:
+            self.evaluations += 1
+            if rule:
+                self.hits[rule[0]] = self.hits.get(rule[0], 0) + 1
+            else:
+                self.fallthroughs += 1
+            if self.evaluations % HITS_FLUSH_EVERY == 0:
+                self.save_hits()
+        if not rule:
+            return None
+        rule_id, activity, confidence = rule
+        return {
+            "activity": activity,
+            "confidence": confidence,
+            "description": f"Matched rule {rule_id}",
+            "details": f"Active window: {snapshot.get('active_window', '')}",
+            "data_sources": "Rules table (" + rule_id.split(":", 1)[0] + ")",
+            "classifier": "rules",
+            "rule": rule_id,
+            "timestamp": time.time()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "evaluations": self.evaluations,
+            "fallthroughs": self.fallthroughs,
+            "hits": {rule_id: count for rule_id, count in sorted(self.hits.items(), key=lambda item: -item[1])}
+        }
+
+    def save_hits(self, path: str = RULE_HITS_FILE):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.stats(), f, indent=2)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️ Could not save rule hit counters: {e}")
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+def get_activity_rules() -> Optional[ActivityRules]:
+    """Compiled rules from RULES_FILE, or None if there is no usable rules file"""
+    global _rules
+    with _rules_lock:
+        if _rules is None:
+            try:
+                _rules = ActivityRules.load()
+            except (OSError, ValueError, KeyError, re.error) as e:
+                print(f"⚠️ Activity rules disabled: {e}")
+                _rules = False
+        return _rules or None
+
+
+def _print_hits(stats: Dict[str, Any], rule_ids: List[str]):
+    hits = stats.get("hits", {})
+    print(f"📏 {stats.get('evaluations', 0)} snapshots checked, {stats.get('fallthroughs', 0)} fell through to the models")
+    for rule_id in sorted(rule_ids, key=lambda r: -hits.get(r, 0)):
+        print(f"   {hits.get(rule_id, 0):>6}  {rule_id}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--stats":
+        rules = ActivityRules.load()
+        try:
+            with open(RULE_HITS_FILE, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = {}
+        _print_hits(saved, rules.rule_ids)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--test":
+        rules = ActivityRules.load()
+        snapshot = {"active_window": sys.argv[2], "ocr_text": sys.argv[3] if len(sys.argv) > 3 else ""}
+        print(rules.classify(snapshot) or "No rule fired; the snapshot would go to the classifier/LLM")
+    else:
+        print("Usage:")
+        print("  python rules_engine.py --stats                      # Hits per rule (zero-hit rules last)")
+        print('  python rules_engine.py --test "WINDOW" ["OCR TEXT"]  # Show which rule fires for a snapshot')
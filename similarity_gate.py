@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Similarity Gate - lets the analyzer skip reclassifying snapshots that barely changed
+Each snapshot gets a 64-bit SimHash over word 3-gram shingles of its window title, OCR text
+and clipboard. If the window is the same and the SimHash is within SIMILARITY_MAX_BITS of the
+last snapshot that was actually classified, the previous prediction is carried forward,
+unless it is older than SIMILARITY_MAX_CARRY_SECONDS.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SIMILARITY_MAX_BITS = int(os.getenv("SIMILARITY_MAX_BITS", "6"))
+SIMILARITY_MAX_CARRY_SECONDS = float(os.getenv("SIMILARITY_MAX_CARRY_SECONDS", "300"))
+SHINGLE_SIZE = 3
+# Long OCR dumps are capped; the head of the screen is enough to tell whether it changed
+MAX_FIELD_CHARS = 8000
+SIMHASH_FIELDS = ("active_window", "ocr_text", "clipboard")
+
+WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(texts: List[str]) -> int:
+    features = []
+    for text in texts:
+        features.extend(shingles((text or "")[:MAX_FIELD_CHARS]))
+    if not features:
+        return 0
+    digests = b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), 64)
+    # Each bit of the fingerprint is the majority vote of that bit across all shingles
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int("".join("1" if v > 0 else "0" for v in votes), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimilarityGate:
+    def __init__(self, max_bits: int = SIMILARITY_MAX_BITS, max_carry_seconds: float = SIMILARITY_MAX_CARRY_SECONDS):
+        self.max_bits = max_bits
+        self.max_carry_seconds = max_carry_seconds
+        # The last snapshot that was really classified, and its prediction
+        self.reference_window = None
+        self.reference_hash = None
+        self.reference_prediction = None
+        self.reference_time = None
+        # SimHash of the snapshot last passed to carry_forward, reused by remember()
+        self.pending_hash = None
+        self.checks = 0
+        self.fired = 0
+        self.forced_refreshes = 0
+
+    def carry_forward(self, snapshot: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The previous prediction (re-stamped) if this snapshot is materially the same, else None"""
+        self.checks += 1
+        self.pending_hash = simhash([snapshot.get(field, "") for field in SIMHASH_FIELDS])
+        if self.reference_prediction is None or snapshot.get("active_window") != self.reference_window:
+            return None
+        distance = hamming_distance(self.pending_hash, self.reference_hash)
+        if distance > self.max_bits:
+            return None
+        age = time.monotonic() - self.reference_time
+        if age > self.max_carry_seconds:
+            self.forced_refreshes += 1
+            return None
+        self.fired += 1
+        result = dict(self.reference_prediction)
+        result["timestamp"] = time.time()
+        result["carried_forward"] = True
+        result["similarity_distance"] = distance
+        return result
+
+    def remember(self, snapshot: Dict[str, Any], prediction: Dict[str, Any]):
+        """Make this freshly classified snapshot the new reference"""
+        self.reference_window = snapshot.get("active_window")
+        self.reference_hash = self.pending_hash
+        if self.reference_hash is None:
+            self.reference_hash = simhash([snapshot.get(field, "") for field in SIMHASH_FIELDS])
+        self.reference_prediction = prediction
+        self.reference_time = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checks": self.checks,
+            "fired": self.fired,
+            "fire_rate": round(self.fired / self.checks, 3) if self.checks else 0.0,
+            "forced_refreshes": self.forced_refreshes
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "--compare":
+        # Compare two stored snapshots by timestamp
+        from snapshot_store import get_snapshot_store
+        store = get_snapshot_store()
+        a, b = store.get(sys.argv[2]), store.get(sys.argv[3])
+        if not a or not b:
+            print("❌ Both snapshots must exist in the snapshot store")
+            sys.exit(1)
+        distance = hamming_distance(simhash([a.get(f, "") for f in SIMHASH_FIELDS]),
+                                    simhash([b.get(f, "") for f in SIMHASH_FIELDS]))
+        same_window = a.get("active_window") == b.get("active_window")
+        verdict = "carry forward" if same_window and distance <= SIMILARITY_MAX_BITS else "reclassify"
+        print(f"Hamming distance {distance}/64, same window: {same_window} -> {verdict}")
+    else:
+        print("Usage:")
+        print("  python similarity_gate.py --compare TIMESTAMP_A TIMESTAMP_B   # Would the gate skip B after A?")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Snapshot Ring - shared-memory ring buffer carrying snapshots from the gatherer to the analyzer
+The last SNAPSHOT_RING_SLOTS snapshots live in a multiprocessing.shared_memory block together
+with a sequence counter, so the analyzer picks up each snapshot straight from memory instead of
+waiting for live_output.json to be rewritten and re-parsed. Disk writes are only persistence.
+
+Layout: a 64-byte header (magic, slot count, slot size, latest sequence) followed by fixed-size
+slots, each a 16-byte header (sequence, payload length, flags) and a zlib-compressed JSON payload.
+There is one producer. A slot's sequence is zeroed while it is being rewritten, so a reader that
+sees the same non-zero sequence before and after copying the payload got a consistent snapshot.
+
+On POSIX the consumer can also hand the producer the write end of a pipe (SNAPSHOT_RING_NOTIFY_FD);
+the producer writes a byte after every publish and the consumer blocks in select() instead of
+polling the counter. A full pipe just means the consumer already has a wake-up pending.
+"""
+
+import json
+import os
+import select
+import struct
+import sys
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+RING_NAME = os.getenv("SNAPSHOT_RING_NAME", "pa_buddy_snapshots")
+RING_SLOTS = int(os.getenv("SNAPSHOT_RING_SLOTS", "8"))
+RING_SLOT_BYTES = int(os.getenv("SNAPSHOT_RING_SLOT_BYTES", str(512 * 1024)))
+
+MAGIC = b"PAR1"
+HEADER = struct.Struct("<4sIIxxxxQ")  # magic, slots, slot bytes, latest sequence
+HEADER_BYTES = 64
+SEQUENCE_OFFSET = 16
+SLOT_HEADER = struct.Struct("<QII")  # sequence, payload length, flags
+FLAG_TRUNCATED = 1
+# Longest-first fields trimmed when a snapshot does not fit in one slot even compressed
+TRUNCATABLE_FIELDS = ("ocr_text", "vscode_text", "focused_text", "clipboard")
+# Consumers poll the sequence counter (a memory read) with this backoff while waiting
+WAIT_MIN_SECONDS = 0.001
+WAIT_MAX_SECONDS = 0.05
+# Environment variable through which the consumer passes the wake-up pipe to the producer process
+NOTIFY_FD_ENV = "SNAPSHOT_RING_NOTIFY_FD"
+
+
+def _open_shared_memory(name: str, create: bool, size: int = 0) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if not create:
+        # Only the creator may unlink the block; before Python 3.13 attaching registers it with
+        # this process's resource tracker, which would unlink it when the attaching process exits
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+class SnapshotRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        magic, self.slots, self.slot_bytes, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory block {shm.name!r} is not a snapshot ring")
+        self.payload_bytes = self.slot_bytes - SLOT_HEADER.size
+        self.truncated = 0
+        self.wake_fd = None  # consumer: read end of the wake-up pipe
+        self.notify_fd = None  # producer: write end
+        if os.getenv(NOTIFY_FD_ENV):
+            self.notify_fd = int(os.environ[NOTIFY_FD_ENV])
+            os.set_blocking(self.notify_fd, False)
+
+    @classmethod
+    def create(cls, name: str = RING_NAME, slots: int = RING_SLOTS, slot_bytes: int = RING_SLOT_BYTES) -> "SnapshotRing":
+        """Create the ring (replacing a stale block left by a crashed run); the creator unlinks it"""
+        size = HEADER_BYTES + slots * slot_bytes
+        try:
+            shm = _open_shared_memory(name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = _open_shared_memory(name, create=True, size=size)
+        shm.buf[:HEADER_BYTES] = bytes(HEADER_BYTES)
+        HEADER.pack_into(shm.buf, 0, MAGIC, slots, slot_bytes, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = RING_NAME) -> "SnapshotRing":
+        """Attach to a ring created by another process (FileNotFoundError if there is none)"""
+        return cls(_open_shared_memory(name, create=False), owner=False)
+
+    @classmethod
+    def open(cls, name: str = RING_NAME) -> "SnapshotRing":
+        """Attach if the consumer already created the ring, otherwise create it"""
+        try:
+            return cls.attach(name)
+        except FileNotFoundError:
+            return cls.create(name)
+
+    # ---- producer ----
+
+    def sequence(self) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, SEQUENCE_OFFSET)[0]
+
+    def _slot_offset(self, sequence: int) -> int:
+        return HEADER_BYTES + (sequence % self.slots) * self.slot_bytes
+
+    def _encode(self, snapshot: Dict[str, Any]) -> Tuple[bytes, int]:
+        payload = zlib.compress(json.dumps(snapshot).encode("utf-8"), 1)
+        if len(payload) <= self.payload_bytes:
+            return payload, 0
+        trimmed = dict(snapshot)
+        while len(payload) > self.payload_bytes:
+            field = max(TRUNCATABLE_FIELDS, key=lambda k: len(trimmed.get(k) or ""))
+            text = trimmed.get(field) or ""
+            if not text:
+                raise ValueError("Snapshot does not fit in a ring slot")
+            trimmed[field] = text[:len(text) // 2]
+            payload = zlib.compress(json.dumps(trimmed).encode("utf-8"), 1)
+        self.truncated += 1
+        return payload, FLAG_TRUNCATED
+
+    def publish(self, snapshot: Dict[str, Any]) -> int:
+        """Write a snapshot into the next slot and bump the sequence; returns its sequence number"""
+        payload, flags = self._encode(snapshot)
+        sequence = self.sequence() + 1
+        offset = self._slot_offset(sequence)
+        buf = self.shm.buf
+        SLOT_HEADER.pack_into(buf, offset, 0, 0, 0)
+        start = offset + SLOT_HEADER.size
+        buf[start:start + len(payload)] = payload
+        SLOT_HEADER.pack_into(buf, offset, sequence, len(payload), flags)
+        struct.pack_into("<Q", buf, SEQUENCE_OFFSET, sequence)
+        if self.notify_fd is not None:
+            try:
+                os.write(self.notify_fd, b"\0")
+            except OSError:
+                pass  # Pipe full (a wake-up is already pending) or the consumer went away
+        return sequence
+
+    # ---- wake-up pipe ----
+
+    def notification_pipe(self) -> int:
+        """Create the wake-up pipe (POSIX only); returns the write end to pass to the producer process"""
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        self.wake_fd = read_fd
+        return write_fd
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self.wake_fd, 4096):
+                pass
+        except BlockingIOError:
+            return
+        # End of file: the producer exited, so fall back to polling the counter
+        os.close(self.wake_fd)
+        self.wake_fd = None
+
+    # ---- consumer ----
+
+    def read(self, sequence: int) -> Optional[Dict[str, Any]]:
+        """The snapshot with this sequence number, or None once it has been overwritten"""
+        if sequence <= 0:
+            return None
+        offset = self._slot_offset(sequence)
+        buf = self.shm.buf
+        slot_sequence, length, flags = SLOT_HEADER.unpack_from(buf, offset)
+        if slot_sequence != sequence:
+            return None
+        start = offset + SLOT_HEADER.size
+        payload = bytes(buf[start:start + length])
+        if SLOT_HEADER.unpack_from(buf, offset)[0] != sequence:
+            return None  # Overwritten while copying
+        snapshot = json.loads(zlib.decompress(payload))
+        if flags & FLAG_TRUNCATED:
+            snapshot["ring_truncated"] = True
+        return snapshot
+
+    def latest(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        # Retry if the producer lapped us between reading the counter and the slot
+        for _ in range(3):
+            sequence = self.sequence()
+            snapshot = self.read(sequence)
+            if snapshot is not None or sequence == 0:
+                return sequence, snapshot
+        return sequence, None
+
+    def recent(self, count: int = RING_SLOTS) -> List[Dict[str, Any]]:
+        """Up to `count` of the newest snapshots still in the ring, oldest first"""
+        newest = self.sequence()
+        snapshots = []
+        for sequence in range(max(1, newest - min(count, self.slots) + 1), newest + 1):
+            snapshot = self.read(sequence)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def wait_for(self, after_sequence: int, timeout: Optional[float] = None) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Block until a sequence newer than `after_sequence` appears; returns (sequence, latest snapshot)
+        On timeout returns (after_sequence, None). Snapshots skipped while the caller was busy are
+        not replayed: the newest one wins."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = WAIT_MIN_SECONDS
+        while True:
+            if self.wake_fd is not None:
+                self._drain_wakeups()
+            if self.sequence() > after_sequence:
+                sequence, snapshot = self.latest()
+                if snapshot is not None:
+                    return sequence, snapshot
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return after_sequence, None
+            if self.wake_fd is not None:
+                # Woken by the producer's next publish; the counter is re-checked after draining
+                select.select([self.wake_fd], [], [], remaining)
+                continue
+            time.sleep(delay if remaining is None else min(delay, remaining))
+            delay = min(WAIT_MAX_SECONDS, delay * 2)
+
+    def close(self):
+        for fd in (self.wake_fd, self.notify_fd):
+            if fd is not None:
+                os.close(fd)
+        self.wake_fd = self.notify_fd = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--tail":
+        ring = SnapshotRing.attach()
+        sequence = 0
+        try:
+            while True:
+                sequence, snapshot = ring.wait_for(sequence)
+                print(f"#{sequence} {snapshot.get('timestamp')} {snapshot.get('active_window', '')}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ring.close()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--latest":
+        ring = SnapshotRing.attach()
+        sequence, snapshot = ring.latest()
+        print(f"Sequence: {sequence}")
+        print(json.dumps(snapshot, indent=2))
+        ring.close()
+    else:
+        print("Usage:")
+        print("  python snapshot_ring.py --tail     # Print each snapshot as the gatherer publishes it")
+        print("  python snapshot_ring.py --latest   # Print the newest snapshot in the ring")
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Snapshot Store - append-only segment storage for gatheruserdata.py snapshots
+Snapshots are appended to segment files as length-prefixed zlib-compressed JSON records,
+with a sidecar index of fixed-width (timestamp, offset) entries per segment.
+Segments rotate per day or when they grow past SEGMENT_MAX_BYTES.
+Lookups by time range binary-search the in-memory index, so they are O(log n).
+Large text fields are stored once as content-addressed blobs and referenced by hash; each
+segment's .refs sidecar lists the blob hashes its records reference, so blob garbage
+collection never has to read the records themselves.
+"""
+
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+STORE_DIR = "output/snapshots"
+SEGMENT_MAX_BYTES = int(os.getenv("SNAPSHOT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# Snapshot fields that repeat across consecutive snapshots and are stored as shared blobs
+BLOB_FIELDS = ("clipboard", "focused_text", "vscode_text", "ocr_text")
+# Shorter values stay inline; a blob reference would not be any smaller
+BLOB_MIN_BYTES = 64
+BLOB_CACHE_SIZE = 256
+# Suffix of a segment rewritten by compaction ("segment_<day>_0000_r"); never appended to
+COMPACTED_SUFFIX = "_r"
+
+_RECORD_HEADER = struct.Struct("<I")    # compressed payload length
+_INDEX_ENTRY = struct.Struct("<dQ")     # epoch seconds, record offset in the segment
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Snapshot timestamp string ("2025-07-16_09-36-24") -> epoch seconds"""
+    return datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp()
+
+
+def record_blob_hashes(record: Dict[str, Any]) -> set:
+    """Blob hashes a stored (not rehydrated) record references"""
+    return {ref["hash"] for ref in record.get("blobs", {}).values()}
+
+
+def _segment_sequence(segment: str) -> int:
+    """"segment_2025-07-16_0003" or "segment_2025-07-16_0003_r" -> 3"""
+    return int(segment.split("_")[2])
+
+
+def _to_epoch(value) -> float:
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class BlobStore:
+    """Content-addressed text blobs: blobs/<first 2 hex chars>/<rest of sha256>, zlib-compressed"""
+
+    def __init__(self, root: str, cache_size: int = BLOB_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, text: str) -> Tuple[str, int]:
+        """Store text once; returns (sha256 hex digest, utf-8 size)"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            try:
+                # Reused blob: bump its mtime so retention's grace period protects it
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(data))
+                # Readers never see a partial blob
+                os.replace(tmp_path, path)
+        return digest, len(data)
+
+    def remove_if_older(self, digest: str, cutoff: float) -> int:
+        """Delete a blob not touched since `cutoff`; returns the bytes freed"""
+        path = self._path(digest)
+        with self._lock:
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    return 0
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                return 0
+            self._cache.pop(digest, None)
+        return size
+
+    def get(self, digest: str) -> str:
+        # The cache is shared by analyzer, backfill and retention threads; the file read isn't locked
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        with open(self._path(digest), "rb") as f:
+            text = zlib.decompress(f.read()).decode("utf-8")
+        with self._lock:
+            self._cache[digest] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def digests(self) -> Iterator[str]:
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if os.path.isdir(prefix_dir):
+                for rest in os.listdir(prefix_dir):
+                    if not rest.endswith(".tmp"):
+                        yield prefix + rest
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(self._path(digest)) for digest in self.digests())
+
+
+class SnapshotStore:
+    def __init__(self, root: str = STORE_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        # Sorted by time: parallel lists so bisect works directly on the epochs
+        self._epochs: List[float] = []
+        self._locations: List[Tuple[str, int]] = []
+        self._index_positions: Dict[str, int] = {}
+        # Inode of each index file read so far, to notice one replaced by a rewrite
+        self._index_inodes: Dict[str, int] = {}
+        self._active_segment: Optional[str] = None
+        # Blob hashes this process already wrote to each segment's .refs sidecar
+        self._refs_written: Dict[str, set] = {}
+        os.makedirs(self.root, exist_ok=True)
+        self.blobs = BlobStore(os.path.join(self.root, "blobs"))
+
+    # ---- index maintenance ----
+
+    def _segment_names(self) -> List[str]:
+        return sorted(name[:-4] for name in os.listdir(self.root) if name.endswith(".idx"))
+
+    def segment_names(self) -> List[str]:
+        return self._segment_names()
+
+    def refresh(self):
+        """Pick up index entries appended since the last call (possibly by another process)"""
+        with self._lock:
+            segments = self._segment_names()
+            # Segments removed by retention/compaction drop out of the index
+            for segment in set(self._index_positions) - set(segments):
+                self._drop_segment(segment)
+            for segment in segments:
+                position = self._index_positions.get(segment, 0)
+                path = os.path.join(self.root, segment + ".idx")
+                try:
+                    stat = os.stat(path)
+                    if position and (stat.st_ino != self._index_inodes.get(segment) or stat.st_size < position):
+                        # Replaced or truncated since we read it: our offsets into it are stale
+                        self._drop_segment(segment)
+                        position = 0
+                    if stat.st_size <= position:
+                        continue
+                    with open(path, "rb") as f:
+                        f.seek(position)
+                        data = f.read()
+                except FileNotFoundError:
+                    continue
+                # Only whole entries count; a half-written tail is picked up next time
+                usable = len(data) - len(data) % _INDEX_ENTRY.size
+                for epoch, offset in _INDEX_ENTRY.iter_unpack(data[:usable]):
+                    self._insert(epoch, (segment, offset))
+                self._index_positions[segment] = position + usable
+                self._index_inodes[segment] = stat.st_ino
+
+    def _drop_segment(self, segment: str):
+        keep = [i for i, (name, _) in enumerate(self._locations) if name != segment]
+        self._epochs = [self._epochs[i] for i in keep]
+        self._locations = [self._locations[i] for i in keep]
+        self._index_positions.pop(segment, None)
+        self._index_inodes.pop(segment, None)
+
+    def _insert(self, epoch: float, location: Tuple[str, int]):
+        if not self._epochs or epoch >= self._epochs[-1]:
+            self._epochs.append(epoch)
+            self._locations.append(location)
+        else:
+            i = bisect.bisect_right(self._epochs, epoch)
+            self._epochs.insert(i, epoch)
+            self._locations.insert(i, location)
+
+    # ---- writing ----
+
+    def _segment_for(self, epoch: float) -> str:
+        prefix = "segment_{}_".format(datetime.datetime.fromtimestamp(epoch).strftime("%Y-%m-%d"))
+        active = self._active_segment
+        if active is None or not active.startswith(prefix):
+            same_day = [s for s in self._segment_names() if s.startswith(prefix)]
+            active = max(same_day, key=_segment_sequence) if same_day else None
+        # Compacted segments are never appended to, nor is one that was compacted behind our back
+        if (active and not active.endswith(COMPACTED_SUFFIX)
+                and not os.path.exists(os.path.join(self.root, active + COMPACTED_SUFFIX + ".idx"))):
+            path = os.path.join(self.root, active + ".seg")
+            if not os.path.exists(path) or os.path.getsize(path) < self.segment_max_bytes:
+                return active
+        # A new sequence number, past every segment of the day, compacted ones included
+        same_day = [s for s in self._segment_names() if s.startswith(prefix)]
+        sequence = max((_segment_sequence(s) for s in same_day), default=-1) + 1
+        return f"{prefix}{sequence:04d}"
+
+    def append(self, snapshot: Dict[str, Any]) -> float:
+        """Append one snapshot; returns its epoch timestamp"""
+        epoch = parse_timestamp(snapshot["timestamp"]) if snapshot.get("timestamp") else datetime.datetime.now().timestamp()
+        record = self._deduplicate(snapshot)
+        payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            segment = self._segment_for(epoch)
+            self._active_segment = segment
+            seg_path = os.path.join(self.root, segment + ".seg")
+            self._append_refs(segment, record_blob_hashes(record), new_segment=not os.path.exists(seg_path))
+            with open(seg_path, "ab") as f:
+                offset = f.tell()
+                f.write(_RECORD_HEADER.pack(len(payload)))
+                f.write(payload)
+            # Index entry goes in only after the record is fully written
+            with open(os.path.join(self.root, segment + ".idx"), "ab") as f:
+                f.write(_INDEX_ENTRY.pack(epoch, offset))
+        return epoch
+
+    def _append_refs(self, segment: str, hashes: set, new_segment: bool):
+        # Written before the record, so a referenced blob is always listed. A segment that predates
+        # .refs files gets a complete one rebuilt by segment_refs() instead of a partial one here
+        written = self._refs_written.setdefault(segment, set())
+        new = hashes - written
+        path = os.path.join(self.root, segment + ".refs")
+        if new and (new_segment or os.path.exists(path)):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(digest + "\n" for digest in sorted(new)))
+            written.update(new)
+
+    def segment_refs(self, segment: str) -> set:
+        """Blob hashes referenced by a segment's records, from its .refs sidecar (rebuilt if missing)"""
+        path = os.path.join(self.root, segment + ".refs")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            pass
+        try:
+            hashes = set()
+            for record in self.read_segment(segment):
+                hashes |= record_blob_hashes(record)
+        except FileNotFoundError:
+            return set()
+        self._write_refs(segment, hashes)
+        return hashes
+
+    def _write_refs(self, segment: str, hashes: set):
+        path = os.path.join(self.root, segment + ".refs")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(digest + "\n" for digest in sorted(hashes)))
+        os.replace(tmp_path, path)
+
+    def _deduplicate(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Swap large text fields for {"hash", "size"} references under record["blobs"]"""
+        record = dict(snapshot)
+        blobs = {}
+        for field in BLOB_FIELDS:
+            value = record.get(field)
+            if isinstance(value, str) and len(value) >= BLOB_MIN_BYTES:
+                digest, size = self.blobs.put(value)
+                blobs[field] = {"hash": digest, "size": size}
+                del record[field]
+        if blobs:
+            record["blobs"] = blobs
+        return record
+
+    def write_segment(self, segment: str, records: List[Dict[str, Any]]):
+        """Write a complete new segment from already-stored records (blob references kept).
+        The index is written last, so readers only see the segment once it is whole.
+        Raises FileExistsError rather than overwrite an existing segment."""
+        seg_path = os.path.join(self.root, segment + ".seg")
+        if os.path.exists(os.path.join(self.root, segment + ".idx")) or os.path.exists(seg_path):
+            raise FileExistsError(f"Segment {segment} already exists")
+        self._write_refs(segment, set().union(*(record_blob_hashes(record) for record in records)))
+        index = bytearray()
+        with open(seg_path, "xb") as f:
+            for record in records:
+                payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+                index += _INDEX_ENTRY.pack(parse_timestamp(record["timestamp"]), f.tell())
+                f.write(_RECORD_HEADER.pack(len(payload)))
+                f.write(payload)
+        tmp_path = os.path.join(self.root, segment + ".idx.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(index)
+        os.replace(tmp_path, os.path.join(self.root, segment + ".idx"))
+
+    def remove_segment(self, segment: str):
+        # Index first: once it is gone no reader will look up the segment's records
+        for suffix in (".idx", ".seg", ".refs"):
+            try:
+                os.remove(os.path.join(self.root, segment + suffix))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._drop_segment(segment)
+            self._refs_written.pop(segment, None)
+        if self._active_segment == segment:
+            self._active_segment = None
+
+    def segment_bytes(self, segment: str) -> int:
+        return sum(os.path.getsize(os.path.join(self.root, segment + suffix))
+                   for suffix in (".seg", ".idx") if os.path.exists(os.path.join(self.root, segment + suffix)))
+
+    def segment_newest_epoch(self, segment: str) -> Optional[float]:
+        """Newest timestamp in a segment, from its index alone"""
+        try:
+            with open(os.path.join(self.root, segment + ".idx"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        return max((epoch for epoch, _ in _INDEX_ENTRY.iter_unpack(data[:usable])), default=None)
+
+    def read_segment(self, segment: str) -> List[Dict[str, Any]]:
+        """Every record of one segment, oldest first, with blob references left in place"""
+        with open(os.path.join(self.root, segment + ".idx"), "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        entries = sorted(_INDEX_ENTRY.iter_unpack(data[:usable]))
+        return [self._read_record((segment, offset), rehydrate=False) for _, offset in entries]
+
+    # ---- reading ----
+
+    def _read_record(self, location: Tuple[str, int], rehydrate: bool = True) -> Dict[str, Any]:
+        segment, offset = location
+        with open(os.path.join(self.root, segment + ".seg"), "rb") as f:
+            f.seek(offset)
+            (length,) = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            record = json.loads(zlib.decompress(f.read(length)).decode("utf-8"))
+        if rehydrate:
+            for field, ref in record.pop("blobs", {}).items():
+                record[field] = self.blobs.get(ref["hash"])
+        return record
+
+    def raw_records(self) -> Iterator[Dict[str, Any]]:
+        """Stored records with blob references left in place"""
+        self.refresh()
+        for location in list(self._locations):
+            try:
+                yield self._read_record(location, rehydrate=False)
+            except FileNotFoundError:
+                continue
+
+    def dedup_report(self) -> Dict[str, Any]:
+        """How much the blob store saves compared to storing every text field inline"""
+        logical_bytes = 0
+        inline_bytes = 0
+        unique = {}
+        records = 0
+        for record in self.raw_records():
+            records += 1
+            for ref in record.get("blobs", {}).values():
+                logical_bytes += ref["size"]
+                unique[ref["hash"]] = ref["size"]
+            for field in BLOB_FIELDS:
+                if isinstance(record.get(field), str):
+                    inline_bytes += len(record[field].encode("utf-8"))
+        unique_bytes = sum(unique.values())
+        segment_bytes = sum(os.path.getsize(os.path.join(self.root, name))
+                            for name in os.listdir(self.root) if name.endswith((".seg", ".idx")))
+        return {
+            "snapshots": records,
+            "text_bytes_logical": logical_bytes + inline_bytes,
+            "text_bytes_unique": unique_bytes + inline_bytes,
+            "unique_blobs": len(unique),
+            "dedup_ratio": round((logical_bytes + inline_bytes) / (unique_bytes + inline_bytes), 2) if unique_bytes + inline_bytes else 1.0,
+            "disk_bytes": segment_bytes + self.blobs.disk_bytes()
+        }
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._epochs)
+
+    def timestamps(self) -> List[float]:
+        self.refresh()
+        return list(self._epochs)
+
+    def get(self, timestamp) -> Optional[Dict[str, Any]]:
+        """Snapshot taken exactly at `timestamp` (string, datetime or epoch), or None"""
+        epoch = _to_epoch(timestamp)
+        self.refresh()
+        i = bisect.bisect_left(self._epochs, epoch)
+        if i < len(self._epochs) and self._epochs[i] == epoch:
+            return self._read_record(self._locations[i])
+        return None
+
+    def range(self, start=None, end=None) -> Iterator[Dict[str, Any]]:
+        """Snapshots with start <= timestamp <= end, oldest first"""
+        self.refresh()
+        lo = 0 if start is None else bisect.bisect_left(self._epochs, _to_epoch(start))
+        hi = len(self._epochs) if end is None else bisect.bisect_right(self._epochs, _to_epoch(end))
+        for location in self._locations[lo:hi]:
+            try:
+                yield self._read_record(location)
+            except FileNotFoundError:
+                # Segment compacted away while we were iterating
+                continue
+
+    def latest(self, count: int = 1) -> List[Dict[str, Any]]:
+        """The `count` most recent snapshots, oldest first"""
+        self.refresh()
+        return [self._read_record(location) for location in self._locations[-count:]] if count > 0 else []
+
+    # ---- migration ----
+
+    def import_legacy_files(self, directory: str = "output", remove: bool = False) -> int:
+        """Append old output/user_data_<ts>.json files that aren't in the store yet"""
+        self.refresh()
+        known = set(self._epochs)
+        imported = 0
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith("user_data_") and name.endswith(".json")):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                if parse_timestamp(snapshot["timestamp"]) not in known:
+                    self.append(snapshot)
+                    imported += 1
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Snapshot Store] Skipping {name}: {e}")
+                continue
+            if remove:
+                os.remove(path)
+        return imported
+
+
+_shared_store = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Process-wide store on the default directory, created on first use"""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = SnapshotStore()
+    return _shared_store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--import":
+        count = get_snapshot_store().import_legacy_files(remove="--remove" in sys.argv)
+        print(f"📦 Imported {count} legacy snapshot file(s) into {STORE_DIR}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--stats":
+        store = get_snapshot_store()
+        stamps = store.timestamps()
+        print(f"📦 {len(stamps)} snapshots in {STORE_DIR}")
+        if stamps:
+            print(f"   from {datetime.datetime.fromtimestamp(stamps[0])} to {datetime.datetime.fromtimestamp(stamps[-1])}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--dedup-report":
+        report = get_snapshot_store().dedup_report()
+        print(f"📦 {report['snapshots']} snapshots, {report['unique_blobs']} unique text blobs")
+        print(f"   text fields: {report['text_bytes_logical']:,} bytes logical -> {report['text_bytes_unique']:,} bytes unique "
+              f"(dedup ratio {report['dedup_ratio']}x)")
+        print(f"   on disk (compressed segments + blobs): {report['disk_bytes']:,} bytes")
+    else:
+        print("Usage:")
+        print("  python snapshot_store.py --import [--remove]  # Move output/user_data_*.json into the store")
+        print("  python snapshot_store.py --stats              # Show what the store holds")
+        print("  python snapshot_store.py --dedup-report       # Show text-field deduplication savings")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Source Collector - gathers every snapshot source in parallel
+Each source runs on a thread pool with its own timeout, and a per-source circuit breaker
+stops retrying sources that keep failing (e.g. osascript on Linux) on every cycle.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Consecutive failures before a source's breaker opens
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("SOURCE_BREAKER_FAILURES", "3"))
+# First open period; doubles every time a half-open retry fails
+BREAKER_BASE_COOLDOWN_SECONDS = float(os.getenv("SOURCE_BREAKER_COOLDOWN", "60"))
+BREAKER_MAX_COOLDOWN_SECONDS = 1800
+
+
+class SourceError(Exception):
+    """Raised when a source returns one of its error strings instead of data"""
+
+
+class CircuitBreaker:
+    """closed -> open after N failures -> half-open once the cooldown passes -> closed on success"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 base_cooldown=BREAKER_BASE_COOLDOWN_SECONDS, max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.cooldown = base_cooldown
+        self.open_until = None
+
+    def state(self, now: Optional[float] = None) -> str:
+        if self.open_until is None:
+            return "closed"
+        now = time.monotonic() if now is None else now
+        return "open" if now < self.open_until else "half-open"
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        return self.state(now) != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.open_until = None
+
+    def record_failure(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if self.open_until is not None:
+            # Half-open probe failed: stay open for twice as long
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self.open_until = now + self.cooldown
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.open_until = now + self.cooldown
+
+
+class Source:
+    def __init__(self, name: str, func: Callable[[], Any], timeout: float = 5.0, default: Any = "",
+                 is_error: Optional[Callable[[Any], bool]] = None, after: Optional[str] = None):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.is_error = is_error
+        # Run right after this other source in the same worker (e.g. clipboard after focused_text,
+        # which may have just copied the editor contents)
+        self.after = after
+        # Value reported while the source is failing or skipped: the last good one
+        self.last_value = default
+        self.breaker = CircuitBreaker()
+
+
+class SourceCollector:
+    def __init__(self, sources: List[Source]):
+        self.sources = {source.name: source for source in sources}
+        self.chains = self._build_chains(sources)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.chains), thread_name_prefix="source")
+        # Chains still running from an earlier cycle are not resubmitted
+        self.in_flight = {}
+
+    @staticmethod
+    def _build_chains(sources: List[Source]) -> List[List[Source]]:
+        chains = []
+        by_name = {}
+        for source in sources:
+            if source.after and source.after in by_name:
+                by_name[source.after].append(source)
+                by_name[source.name] = by_name[source.after]
+            else:
+                chain = [source]
+                chains.append(chain)
+                by_name[source.name] = chain
+        return chains
+
+    def _run_source(self, source: Source) -> Dict[str, Any]:
+        now = time.monotonic()
+        if not source.breaker.allow(now):
+            return {"status": "skipped", "breaker": "open"}
+        start = time.perf_counter()
+        try:
+            value = source.func()
+            if source.is_error and source.is_error(value):
+                raise SourceError(str(value))
+        except Exception as e:
+            source.breaker.record_failure()
+            return {"status": "error", "error": str(e)[:200], "ms": _elapsed_ms(start),
+                    "breaker": source.breaker.state()}
+        source.breaker.record_success()
+        source.last_value = value
+        return {"status": "ok", "ms": _elapsed_ms(start)}
+
+    def _run_chain(self, chain: List[Source]) -> Dict[str, Dict[str, Any]]:
+        return {source.name: self._run_source(source) for source in chain}
+
+    def collect(self) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """Run every source once; returns (values, per-source status)"""
+        status = {}
+        pending = []
+        for chain in self.chains:
+            key = chain[0].name
+            future = self.in_flight.get(key)
+            if future is not None and not future.done():
+                for source in chain:
+                    status[source.name] = {"status": "skipped", "error": "previous call still running"}
+                continue
+            future = self.executor.submit(self._run_chain, chain)
+            self.in_flight[key] = future
+            pending.append((chain, future, time.monotonic() + sum(s.timeout for s in chain)))
+
+        for chain, future, deadline in pending:
+            try:
+                status.update(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                for source in chain:
+                    source.breaker.record_failure()
+                    status[source.name] = {"status": "timeout", "ms": int(source.timeout * 1000),
+                                           "breaker": source.breaker.state()}
+
+        values = {name: source.last_value for name, source in self.sources.items()}
+        return values, status
+
+
+def _elapsed_ms(start: float) -> int:
+    return int((time.perf_counter() - start) * 1000)
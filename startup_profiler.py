@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Startup Profiler - timing breakdown of PA Buddy start-up (imports, constructors, first paint)
+Enabled with `python pa_buddy_ui.py --profile-startup` or PA_PROFILE_STARTUP=1. When disabled,
+measure() only costs a function call, so instrumentation can stay in place.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv or os.getenv("PA_PROFILE_STARTUP") == "1"
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = PROFILE_STARTUP):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        # (kind, name, started after origin, seconds, modules newly imported) in completion order
+        self.records: List[Tuple[str, str, float, float, int]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        """Time the block as one `kind` ("import", "construct", ...) entry"""
+        if not self.enabled:
+            yield
+            return
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.records.append((kind, name, start - self.origin, elapsed, len(sys.modules) - modules_before))
+
+    def mark(self, name: str):
+        """Record a milestone (e.g. first paint) at the current time"""
+        if self.enabled:
+            with self._lock:
+                self.records.append(("milestone", name, time.perf_counter() - self.origin, 0.0, 0))
+
+    def report(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            records = sorted(self.records, key=lambda record: record[2])
+        print("⏱️ Startup profile (ms since the profiler started)")
+        print(f"  {'at':>8} {'took':>8}  {'kind':<10} name")
+        for kind, name, started, elapsed, modules in records:
+            took = "" if kind == "milestone" else f"{elapsed * 1000:8.1f}"
+            extra = f"  (+{modules} modules)" if modules else ""
+            print(f"  {started * 1000:8.1f} {took:>8}  {kind:<10} {name}{extra}")
+
+
+_shared_profiler = None
+_shared_profiler_lock = threading.Lock()
+
+
+def get_startup_profiler() -> StartupProfiler:
+    global _shared_profiler
+    with _shared_profiler_lock:
+        if _shared_profiler is None:
+            _shared_profiler = StartupProfiler()
+        return _shared_profiler
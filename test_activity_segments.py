@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the activity segmenter's hysteresis, gaps and breaks
+"""
+
+from activity_segments import BREAK, END, START, UPDATE, ActivitySegmenter
+
+T0 = 1_750_000_000.0
+
+
+def feed(segmenter, activity, offset, confidence=0.9, **extra):
+    return segmenter.feed(dict({"activity": activity, "confidence": confidence, "timestamp": T0 + offset}, **extra))
+
+
+def kinds(events):
+    return [(e["event"], e["activity"]) for e in events]
+
+
+def test_a_single_misclassification_does_not_end_the_segment():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    feed(segmenter, "coding", 20)
+    assert kinds(feed(segmenter, "browsing", 40)) == [(UPDATE, "coding")]
+    assert kinds(feed(segmenter, "coding", 60)) == [(UPDATE, "coding")]
+
+    current = segmenter.current()
+    assert current["activity"] == "coding"
+    assert current["absorbed"] == 1
+    assert current["duration_seconds"] == 60
+
+
+def test_a_challenger_with_enough_evidence_takes_over_from_its_first_prediction():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    feed(segmenter, "coding", 20)
+    assert kinds(feed(segmenter, "browsing", 40)) == [(UPDATE, "coding")]
+    events = feed(segmenter, "browsing", 60)
+
+    assert kinds(events) == [(END, "coding"), (START, "browsing")]
+    ended, started = events
+    assert ended["end"] == T0 + 40
+    assert started["start"] == T0 + 40
+    assert started["predictions"] == 2
+    assert started["after_break"] is False
+
+
+def test_low_confidence_predictions_need_more_of_them_to_switch():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    for offset in (20, 40, 60):
+        assert kinds(feed(segmenter, "browsing", offset, confidence=0.4)) == [(UPDATE, "coding")]
+    assert kinds(feed(segmenter, "browsing", 80, confidence=0.4)) == [(END, "coding"), (START, "browsing")]
+
+
+def test_alternating_challengers_never_accumulate_evidence():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    for i, activity in enumerate(["browsing", "email", "browsing", "email"]):
+        assert kinds(feed(segmenter, activity, 20 * (i + 1))) == [(UPDATE, "coding")]
+    assert segmenter.current()["absorbed"] == 3
+
+
+def test_a_gap_closes_the_segment_where_the_last_prediction_left_it():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    feed(segmenter, "coding", 100)
+    events = feed(segmenter, "coding", 2000)
+
+    assert kinds(events) == [(END, "coding"), (START, "coding")]
+    assert events[0]["end"] == T0 + 100
+    assert events[1]["after_break"] is True
+
+
+def test_a_locked_screen_is_a_break_whatever_the_classifier_said():
+    segmenter = ActivitySegmenter(switch_evidence=1.5, max_gap=600)
+    feed(segmenter, "coding", 0)
+    feed(segmenter, "coding", 20, screen_locked=False)
+    feed(segmenter, "coding", 300, confidence=0.2, screen_locked=True)
+    events = feed(segmenter, "coding", 600, confidence=0.2, screen_locked=True)
+    assert kinds(events) == [(END, "coding"), (START, BREAK)]
+    assert events[1]["start"] == T0 + 300
+
+    feed(segmenter, "coding", 900)
+    events = feed(segmenter, "coding", 920)
+    assert kinds(events) == [(END, BREAK), (START, "coding")]
+    assert events[1]["after_break"] is True
+
+
+def test_duplicate_and_out_of_order_predictions_are_ignored():
+    segmenter = ActivitySegmenter()
+    feed(segmenter, "coding", 0)
+    feed(segmenter, "coding", 20)
+    assert feed(segmenter, "coding", 20) == []
+    assert feed(segmenter, "browsing", 10) == []
+    assert segmenter.current()["predictions"] == 2
+
+
+def test_subscribers_get_events_until_they_unsubscribe():
+    segmenter = ActivitySegmenter()
+    received = []
+    unsubscribe = segmenter.subscribe(received.append)
+    feed(segmenter, "coding", 0)
+
+    def failing(event):
+        raise RuntimeError("subscriber bug")
+    segmenter.subscribe(failing)
+    feed(segmenter, "coding", 20)
+    unsubscribe()
+    feed(segmenter, "coding", 40)
+    final = segmenter.finish()
+
+    assert kinds(received) == [(START, "coding"), (UPDATE, "coding")]
+    assert final["event"] == END and final["duration_seconds"] == 40
+    assert segmenter.current() is None
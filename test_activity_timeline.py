@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite activity timeline
+"""
+
+from activity_timeline import TIMELINE_MAX_GAP_SECONDS, PredictionStore
+from snapshot_store import parse_timestamp
+
+
+def prediction(activity, confidence=0.9):
+    return {"activity": activity, "confidence": confidence, "description": activity}
+
+
+def fill(store, minutes_and_activities, hour=9):
+    store.put_many([(f"2025-07-16_{hour:02d}-{minute:02d}-00", prediction(activity))
+                    for minute, activity in minutes_and_activities], source="backfill")
+
+
+def test_put_get_existing_and_range(tmp_path):
+    store = PredictionStore(str(tmp_path / "timeline.sqlite"))
+    fill(store, [(0, "coding"), (5, "browsing"), (10, "coding")])
+
+    assert store.get("2025-07-16_09-05-00")["activity"] == "browsing"
+    assert store.get("2025-07-16_09-06-00") is None
+    assert store.existing(["2025-07-16_09-00-00", "2025-07-16_09-01-00"]) == {"2025-07-16_09-00-00"}
+    assert [p["snapshot_ts"] for p in store.range("2025-07-16_09-04-00", "2025-07-16_09-10-00")] == [
+        "2025-07-16_09-05-00", "2025-07-16_09-10-00"]
+
+
+def test_newer_prediction_replaces_older(tmp_path):
+    store = PredictionStore(str(tmp_path / "timeline.sqlite"))
+    store.put("2025-07-16_09-00-00", prediction("unknown"))
+    store.put("2025-07-16_09-00-00", prediction("coding"))
+    assert len(store) == 1
+    assert store.get("2025-07-16_09-00-00")["activity"] == "coding"
+
+
+def test_queued_live_predictions_are_written_on_close(tmp_path):
+    path = str(tmp_path / "timeline.sqlite")
+    store = PredictionStore(path)
+    for minute in range(3):
+        store.record(f"2025-07-16_09-0{minute}-00", prediction("coding"))
+    store.close()
+    assert len(PredictionStore(path)) == 3
+
+
+def test_time_per_activity_caps_gaps(tmp_path):
+    store = PredictionStore(str(tmp_path / "timeline.sqlite"))
+    # Five minutes of coding, one of browsing, then an hour away before the last prediction
+    fill(store, [(0, "coding"), (5, "browsing"), (6, "coding")])
+    store.put("2025-07-16_10-06-00", prediction("coding"))
+
+    (day,) = store.time_per_activity().values()
+    assert day == {"coding": 300 + TIMELINE_MAX_GAP_SECONDS, "browsing": 60}
+
+
+def test_spans_and_longest_streak(tmp_path):
+    store = PredictionStore(str(tmp_path / "timeline.sqlite"))
+    fill(store, [(0, "coding"), (2, "coding"), (4, "browsing"), (5, "coding"), (6, "coding"),
+                 (8, "coding"), (10, "meeting")])
+
+    spans = store.spans("coding")
+    assert [(s["predictions"], s["seconds"]) for s in spans] == [(2, 240), (3, 300)]
+    streak = store.longest_streak("coding")
+    assert streak["start"] == parse_timestamp("2025-07-16_09-05-00")
+    assert store.longest_streak("gaming") is None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the resumable backfill in activity_analyzer.py (needs the app's requirements installed)
+"""
+
+import json
+import os
+import re
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain")
+# The analyzer copies the key into the environment at import time; the LLM itself is faked below
+os.environ.setdefault("GOOGLE_API_KEY", "unused-in-tests")
+
+import activity_analyzer  # noqa: E402
+from activity_timeline import PredictionStore  # noqa: E402
+from llm_rate_limiter import LLMRateLimiter  # noqa: E402
+from snapshot_store import SnapshotStore  # noqa: E402
+
+TIMESTAMPS = [f"2025-07-16_09-0{minute}-00" for minute in range(5)]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Answers batch and single prompts; raises for any prompt containing a marker in `fail_on`"""
+
+    def __init__(self, fail_on=(), garble=()):
+        self.fail_on = set(fail_on)
+        self.garble = set(garble)
+        self.markers_seen = []
+
+    def __call__(self, messages):
+        prompt = messages[-1].content
+        markers = re.findall(r"marker-\d", prompt)
+        self.markers_seen.extend(markers)
+        if self.fail_on & set(markers):
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota)")
+        if self.garble & set(markers):
+            return FakeResponse("Sorry, I can't help with that")
+        ids = re.findall(r'Snapshot id="(\d+)"', prompt)
+        if ids:
+            return FakeResponse(json.dumps([{"id": i, "activity": "coding", "confidence": 0.9} for i in ids]))
+        return FakeResponse(json.dumps({"activity": "coding", "confidence": 0.9}))
+
+
+@pytest.fixture
+def backfill(tmp_path, monkeypatch):
+    snapshots = SnapshotStore(str(tmp_path / "snapshots"))
+    for i, timestamp in enumerate(TIMESTAMPS):
+        snapshots.append({"timestamp": timestamp, "active_window": "Code", "focused_text": f"marker-{i}"})
+    predictions = PredictionStore(str(tmp_path / "timeline.sqlite"))
+    monkeypatch.setattr(activity_analyzer, "get_snapshot_store", lambda: snapshots)
+    monkeypatch.setattr(activity_analyzer, "get_prediction_store", lambda: predictions)
+    monkeypatch.setattr(activity_analyzer, "BACKFILL_CHECKPOINT", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(activity_analyzer, "BATCH_MAX_ITEMS", 2)
+    monkeypatch.setattr(activity_analyzer, "batch_sizer", activity_analyzer.BatchSizer(2))
+    # Every snapshot goes to the (fake) LLM; nothing is learned or cached outside tmp_path
+    monkeypatch.setattr(activity_analyzer, "classify_without_llm", lambda user_data, combined_text: None)
+    monkeypatch.setattr(activity_analyzer, "_remember_llm_result", lambda user_data, combined_text, result: None)
+    monkeypatch.setattr(activity_analyzer, "get_llm_limiter", lambda: LLMRateLimiter(rpm=60000, burst=100))
+
+    def run(llm):
+        monkeypatch.setattr(activity_analyzer, "get_llm", lambda **options: llm)
+        activity_analyzer.backfill_range(TIMESTAMPS[0], TIMESTAMPS[-1], workers=1)
+        return llm
+    run.predictions = predictions
+    run.checkpoint = str(tmp_path / "checkpoint.json")
+    return run
+
+
+def test_backfill_classifies_the_range(backfill):
+    backfill(FakeLLM())
+    assert backfill.predictions.existing(TIMESTAMPS) == set(TIMESTAMPS)
+    assert not os.path.exists(backfill.checkpoint)
+
+
+def test_backfill_resumes_after_a_failed_batch(backfill):
+    backfill(FakeLLM(fail_on={"marker-2"}))
+    done = backfill.predictions.existing(TIMESTAMPS)
+    assert TIMESTAMPS[2] not in done
+    assert all(not backfill.predictions.get(ts).get("failed") for ts in done)
+    assert os.path.exists(backfill.checkpoint)
+
+    llm = backfill(FakeLLM())
+    assert backfill.predictions.existing(TIMESTAMPS) == set(TIMESTAMPS)
+    # The second run only sends what the first one didn't store
+    assert set(llm.markers_seen) == {f"marker-{i}" for i, ts in enumerate(TIMESTAMPS) if ts not in done}
+    assert not os.path.exists(backfill.checkpoint)
+
+
+def test_unparseable_snapshot_is_not_stored_and_is_retried(backfill):
+    backfill(FakeLLM(garble={"marker-4"}))
+    assert TIMESTAMPS[4] not in backfill.predictions.existing(TIMESTAMPS)
+
+    backfill(FakeLLM())
+    assert backfill.predictions.get(TIMESTAMPS[4])["activity"] == "coding"
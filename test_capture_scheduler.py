@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive capture scheduler
+"""
+
+import pytest
+
+import capture_scheduler
+from capture_scheduler import CaptureScheduler
+
+
+@pytest.fixture
+def idle_machine(monkeypatch):
+    monkeypatch.setattr(capture_scheduler, "read_load_per_core", lambda: None)
+
+
+def snapshot(window="Code", clipboard="", ocr_text=""):
+    return {"active_window": window, "clipboard": clipboard, "focused_text": "", "vscode_text": "", "ocr_text": ocr_text}
+
+
+def test_activity_speeds_capture_up(idle_machine):
+    scheduler = CaptureScheduler(base=20, minimum=5, maximum=300)
+    assert scheduler.next_interval(snapshot())[0] == 20
+    assert scheduler.next_interval(snapshot(window="Chrome"))[0] == 5
+    assert scheduler.next_interval(snapshot(window="Chrome", clipboard="copied"))[0] == 5
+    assert scheduler.next_interval(snapshot(window="Chrome", clipboard="copied", ocr_text="scrolled"))[0] == 20
+
+
+def test_unchanged_screens_back_off_exponentially_up_to_the_maximum(idle_machine):
+    scheduler = CaptureScheduler(base=20, minimum=5, maximum=300)
+    scheduler.next_interval(snapshot())
+    intervals = [scheduler.next_interval(snapshot())[0] for _ in range(5)]
+    assert intervals == [40, 80, 160, 300, 300]
+    # Any change resets the back-off
+    assert scheduler.next_interval(snapshot(window="Terminal"))[0] == 5
+    assert scheduler.next_interval(snapshot(window="Terminal"))[0] == 40
+
+
+def test_a_locked_screen_is_sampled_at_the_maximum_interval(idle_machine):
+    scheduler = CaptureScheduler(base=20, minimum=5, maximum=300)
+    scheduler.next_interval(snapshot())
+    interval, reason = scheduler.next_interval(snapshot(window="loginwindow"))
+    assert (interval, reason) == (300, "screen locked")
+
+
+def test_load_over_budget_slows_capture_down(monkeypatch):
+    monkeypatch.setattr(capture_scheduler, "read_load_per_core", lambda: 1.5)
+    scheduler = CaptureScheduler(base=20, minimum=5, maximum=300, cpu_budget=0.75)
+    interval, reason = scheduler.next_interval(snapshot())
+    assert interval == 40
+    assert "over budget" in reason
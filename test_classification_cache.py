@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent classification cache
+"""
+
+import time
+
+from classification_cache import EVICT_EVERY, ClassificationCache, cache_key, normalize_text
+
+RESULT = {"activity": "coding", "confidence": 0.9, "description": "Editing Python", "timestamp": 1.0}
+
+
+def test_volatile_digits_do_not_change_the_key():
+    assert normalize_text("Inbox (12)  at 10:41 AM on 2025-07-16") == normalize_text("inbox (3) at 9:05 am on 2025-07-17")
+    assert cache_key("Slack - 3 unread") == cache_key("Slack - 17 unread")
+    assert cache_key("Slack - general") != cache_key("Slack - random")
+
+
+def test_hit_returns_the_result_with_a_fresh_timestamp(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "cache.sqlite"))
+    cache.put("Active Window: Code - main.py", RESULT)
+
+    hit = cache.get("Active Window: Code  -  main.py")
+    assert hit["activity"] == "coding"
+    assert hit["cached"] is True
+    assert hit["timestamp"] > RESULT["timestamp"]
+    assert cache.get("Active Window: Chrome") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ClassificationCache(path).put("Active Window: Code", RESULT)
+    assert ClassificationCache(path).get("Active Window: Code")["activity"] == "coding"
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "cache.sqlite"), ttl=0.05)
+    cache.put("Active Window: Code", RESULT)
+    time.sleep(0.1)
+    assert cache.get("Active Window: Code") is None
+
+
+def test_least_recently_used_entries_are_evicted_past_the_cap(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    cache.put("window keep", RESULT)
+    for i in range(EVICT_EVERY - 1):
+        cache.put(f"window {chr(ord('a') + i % 26)} {'x' * (i // 26)}", RESULT)
+        if i % 5 == 0:
+            cache.get("window keep")
+
+    assert cache.stats()["entries"] == 10
+    assert cache.get("window keep") is not None
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared LLM rate limiter
+"""
+
+import threading
+import time
+
+import pytest
+
+from llm_rate_limiter import BACKGROUND, INTERACTIVE, LLMRateLimiter, RateLimitTimeout, estimate_tokens
+
+
+def test_calls_within_the_burst_do_not_wait():
+    limiter = LLMRateLimiter(rpm=60, burst=3)
+    waits = [limiter.acquire(100) for _ in range(3)]
+    assert max(waits) < 0.05
+    assert limiter.stats()["background"]["waited"] == 0
+
+
+def test_calls_past_the_burst_wait_for_the_request_rate():
+    limiter = LLMRateLimiter(rpm=600, burst=1)
+    limiter.acquire()
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.5
+
+
+def test_token_budget_is_enforced():
+    limiter = LLMRateLimiter(rpm=6000, tpm=6000, burst=10)
+    limiter.acquire(6000)
+    # The bucket refills at 100 tokens per second
+    waited = limiter.acquire(20)
+    assert 0.1 < waited < 0.6
+
+
+def test_interactive_calls_go_before_queued_background_calls():
+    limiter = LLMRateLimiter(rpm=120, burst=1)
+    limiter.acquire()
+    finished = []
+
+    def call(name, priority):
+        limiter.acquire(priority=priority)
+        finished.append(name)
+
+    background = threading.Thread(target=call, args=("background", BACKGROUND))
+    background.start()
+    time.sleep(0.1)
+    interactive = threading.Thread(target=call, args=("interactive", INTERACTIVE))
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+
+    assert finished == ["interactive", "background"]
+
+
+def test_same_priority_calls_are_served_in_arrival_order():
+    limiter = LLMRateLimiter(rpm=1200, burst=1)
+    limiter.acquire()
+    finished = []
+    threads = []
+    for i in range(4):
+        thread = threading.Thread(target=lambda i=i: (limiter.acquire(), finished.append(i)))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+
+    assert finished == [0, 1, 2, 3]
+
+
+def test_timeout_raises_and_leaves_the_queue():
+    limiter = LLMRateLimiter(rpm=1, burst=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.1)
+    assert limiter.stats()["queued"] == 0
+
+
+def test_estimate_tokens_is_about_four_characters_per_token():
+    assert estimate_tokens("x" * 400) == 101
+    assert estimate_tokens("ab", None, "cd") == 2
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for tiered retention and compaction of the snapshot store
+"""
+
+import os
+import time
+
+from retention import RetentionEngine
+from snapshot_store import SnapshotStore, parse_timestamp
+
+
+def snapshot(timestamp, window, ocr_text=""):
+    return {"timestamp": timestamp, "active_window": window, "ocr_text": ocr_text}
+
+
+def append_run(store, hour, window, minutes=range(0, 30, 5), ocr_text=""):
+    for minute in minutes:
+        store.append(snapshot(f"2025-07-16_{hour:02d}-{minute:02d}-00", window, ocr_text))
+
+
+def age_blobs(store, seconds):
+    past = time.time() - seconds
+    for digest in store.blobs.digests():
+        os.utime(store.blobs._path(digest), (past, past))
+
+
+def test_compacting_twice_on_the_same_day_keeps_both_passes(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    engine = RetentionEngine(store, full_hours=2, segments_per_pass=10)
+    append_run(store, 8, "editor")
+    append_run(store, 8, "browser", minutes=range(30, 60, 5))
+
+    report = engine.run_pass(now=parse_timestamp("2025-07-16_12-00-00"))
+    assert [(a["action"], a["snapshots"], a["kept"]) for a in report["actions"]] == [("compact", 12, 2)]
+
+    # Appends after a compaction must not reuse the compacted segment's sequence
+    append_run(store, 10, "terminal")
+    report = engine.run_pass(now=parse_timestamp("2025-07-16_13-00-00"))
+    assert [(a["action"], a["kept"]) for a in report["actions"]] == [("compact", 1)]
+
+    assert store.segment_names() == ["segment_2025-07-16_0000_r", "segment_2025-07-16_0001_r"]
+    reader = SnapshotStore(str(tmp_path))
+    assert [s["active_window"] for s in reader.range()] == ["editor", "browser", "terminal"]
+    assert engine.run_pass(now=parse_timestamp("2025-07-16_14-00-00"))["actions"] == []
+
+
+def test_representatives_record_the_span_they_stand_for(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    append_run(store, 8, "editor")
+    RetentionEngine(store, full_hours=2).run_pass(now=parse_timestamp("2025-07-16_12-00-00"))
+
+    (kept,) = list(store.range())
+    assert kept["retention"] == {"tier": "representative", "segment_start": "2025-07-16_08-00-00",
+                                 "segment_end": "2025-07-16_08-25-00", "snapshots": 6}
+
+
+def test_old_segments_become_hourly_aggregates(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    engine = RetentionEngine(store, full_hours=2, segment_days=1)
+    append_run(store, 8, "editor")
+    append_run(store, 9, "browser", minutes=range(0, 20, 5))
+
+    report = engine.run_pass(now=parse_timestamp("2025-07-18_12-00-00"))
+    assert [a["action"] for a in report["actions"]] == ["aggregate"]
+    assert len(store) == 0
+    aggregates = engine.read_aggregates()
+    assert [(a["hour"], a["snapshots"], a["windows"]) for a in aggregates] == [
+        ("2025-07-16 08:00", 6, {"editor": 6}), ("2025-07-16 09:00", 4, {"browser": 4})]
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    append_run(store, 8, "editor")
+    report = RetentionEngine(store, full_hours=2).run_pass(dry_run=True, now=parse_timestamp("2025-07-16_12-00-00"))
+
+    assert report["bytes_reclaimed"] > 0
+    assert store.segment_names() == ["segment_2025-07-16_0000"]
+    assert len(store) == 6
+
+
+def test_blob_collection_keeps_blobs_other_segments_reference(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    shared = "shared text that both days contain " * 4
+    append_run(store, 8, "editor", ocr_text=shared)
+    for minute in range(0, 30, 5):
+        store.append(snapshot(f"2025-07-16_09-{minute:02d}-00", "editor", f"only on the first day {minute} " * 4))
+    store.append(snapshot("2025-07-17_09-00-00", "editor", shared))
+    age_blobs(store, 2 * 3600)
+
+    engine = RetentionEngine(store, full_hours=2, segment_days=1)
+    report = engine.run_pass(now=parse_timestamp("2025-07-17_12-00-00"))
+
+    assert [a["segment"] for a in report["actions"]] == ["segment_2025-07-16_0000"]
+    assert report["blobs_removed"] == 6
+    assert [s["ocr_text"] for s in store.range()] == [shared]
+
+
+def test_blob_collection_spares_recent_blobs(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    append_run(store, 8, "editor", ocr_text="text that only this segment has " * 4)
+    report = RetentionEngine(store, full_hours=2, segment_days=1).run_pass(now=parse_timestamp("2025-07-18_12-00-00"))
+
+    assert report["blobs_removed"] == 0
+    assert len(list(store.blobs.digests())) == 1
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only snapshot store
+"""
+
+import pytest
+
+from snapshot_store import SnapshotStore, parse_timestamp
+
+
+def snapshot(timestamp, window="Terminal", ocr_text=""):
+    return {"timestamp": timestamp, "active_window": window, "ocr_text": ocr_text}
+
+
+def test_append_get_and_range(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    for minute in range(5):
+        store.append(snapshot(f"2025-07-16_09-0{minute}-00", window=f"w{minute}"))
+
+    assert len(store) == 5
+    assert store.get("2025-07-16_09-02-00")["active_window"] == "w2"
+    assert store.get("2025-07-16_09-02-30") is None
+    found = [s["active_window"] for s in store.range("2025-07-16_09-01-00", "2025-07-16_09-03-00")]
+    assert found == ["w1", "w2", "w3"]
+    assert [s["active_window"] for s in store.latest(2)] == ["w3", "w4"]
+
+
+def test_out_of_order_appends_are_returned_in_time_order(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    for timestamp in ("2025-07-16_09-05-00", "2025-07-16_09-01-00", "2025-07-16_09-03-00"):
+        store.append(snapshot(timestamp))
+
+    assert [s["timestamp"] for s in store.range()] == [
+        "2025-07-16_09-01-00", "2025-07-16_09-03-00", "2025-07-16_09-05-00"]
+
+
+def test_segments_roll_over_by_size_and_day(tmp_path):
+    store = SnapshotStore(str(tmp_path), segment_max_bytes=200)
+    for minute in range(6):
+        store.append(snapshot(f"2025-07-16_09-0{minute}-00", window="x" * 60))
+    store.append(snapshot("2025-07-17_09-00-00"))
+
+    segments = store.segment_names()
+    assert segments[0] == "segment_2025-07-16_0000"
+    assert len([s for s in segments if s.startswith("segment_2025-07-16_")]) > 1
+    assert segments[-1] == "segment_2025-07-17_0000"
+    assert len(store) == 7
+
+
+def test_reader_sees_appends_from_another_instance(tmp_path):
+    writer = SnapshotStore(str(tmp_path))
+    reader = SnapshotStore(str(tmp_path))
+    writer.append(snapshot("2025-07-16_09-00-00"))
+    assert len(reader) == 1
+    writer.append(snapshot("2025-07-16_09-01-00"))
+    assert [s["timestamp"] for s in reader.range()] == ["2025-07-16_09-00-00", "2025-07-16_09-01-00"]
+
+
+def test_reader_reloads_a_rewritten_segment(tmp_path):
+    writer = SnapshotStore(str(tmp_path))
+    reader = SnapshotStore(str(tmp_path))
+    for minute in range(4):
+        writer.append(snapshot(f"2025-07-16_09-0{minute}-00", window=f"w{minute}"))
+    assert len(reader) == 4
+
+    segment = writer.segment_names()[0]
+    records = writer.read_segment(segment)
+    writer.remove_segment(segment)
+    writer.write_segment(segment, records[1:3])
+
+    # Stale offsets into the old index would read garbage here
+    assert [s["active_window"] for s in reader.range()] == ["w1", "w2"]
+
+
+def test_write_segment_refuses_to_overwrite(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.append(snapshot("2025-07-16_09-00-00"))
+    segment = store.segment_names()[0]
+    with pytest.raises(FileExistsError):
+        store.write_segment(segment, [])
+    assert len(store.read_segment(segment)) == 1
+
+
+def test_large_text_fields_are_stored_once(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    text = "def main():\n    return 42\n" * 20
+    for minute in range(3):
+        store.append(snapshot(f"2025-07-16_09-0{minute}-00", ocr_text=text))
+
+    assert len(list(store.blobs.digests())) == 1
+    assert all(s["ocr_text"] == text for s in store.range())
+    report = store.dedup_report()
+    assert report["unique_blobs"] == 1
+    assert report["dedup_ratio"] == 3.0
+
+
+def test_parse_timestamp_round_trips_snapshot_format():
+    assert parse_timestamp("2025-07-16_09-00-01") - parse_timestamp("2025-07-16_09-00-00") == 1